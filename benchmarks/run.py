@@ -0,0 +1,176 @@
+"""
+Timing and memory benchmarks of the hot paths on synthetic phase fields.
+
+    python -m benchmarks.run                          # all cases, compared with benchmarks/baseline.json
+    python -m benchmarks.run --case quaternary --repeat 5
+    python -m benchmarks.run --elements 5 --entries 3000 --entry-natoms 12 --natoms 20 --limit 8
+    python -m benchmarks.run --update-baseline        # store the current numbers as the baseline
+
+Exits with status 1 if any stage is slower or uses more memory than the baseline allows.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, Any, Optional
+
+from phasebo.phase_field import PhaseField
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.list_compositions import generate
+from benchmarks.synthetic import synthetic_field
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Computed entries have up to entry_natoms atoms, generated candidates up to Ntot (N_atom), of which
+# n_candidates form the BO domain. The large cases are of the size of real campaigns; their surrogate
+# and acquisition are the ones meant for such fields.
+LARGE = {'surrogate': 'random_features', 'acquisition': 'chunked_thompson'}
+CASES: Dict[str, Dict[str, Any]] = {
+    'ternary': {'n_elements': 3, 'n_entries': 60, 'entry_natoms': 24, 'Ntot': 60},
+    'quaternary': {'n_elements': 4, 'n_entries': 200, 'entry_natoms': 16, 'Ntot': 30, 'limit': 12},
+    'quinary': {'n_elements': 5, 'n_entries': 400, 'entry_natoms': 12, 'Ntot': 20},
+    'senary': {'n_elements': 6, 'n_entries': 600, 'entry_natoms': 10, 'Ntot': 16},
+    'quinary-large': {'n_elements': 5, 'n_entries': 10000, 'entry_natoms': 24, 'Ntot': 50, 'n_candidates': 20000,
+                      **LARGE},
+    'senary-large': {'n_elements': 6, 'n_entries': 30000, 'entry_natoms': 16, 'Ntot': 36, 'n_candidates': 50000,
+                     **LARGE},
+}
+
+# Differences below these are measurement noise (stages of a few ms vary by more than half between runs);
+# in the large cases every stage is well above them, so a regression beyond the tolerances is reported
+TIME_FLOOR = 0.01
+MEMORY_FLOOR = 0.25
+
+def measure(fn: Callable, repeat: int = 3) -> Dict[str, float]:
+    """Best wall time of repeat calls and peak traced memory (MB) of one extra call."""
+    times = []
+    for _ in range(repeat):
+        np.random.seed(0)
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    np.random.seed(0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'time': min(times), 'peak_mb': peak / 2 ** 20}
+
+def run_case(n_elements: int, n_entries: int, entry_natoms: int = 12, Ntot: int = 16, limit: Optional[int] = None,
+             n_candidates: int = 2000, repeat: int = 3, **bo_kwargs) -> Dict[str, Dict[str, float]]:
+    """Benchmark every stage on one synthetic field; bo_kwargs (e.g. surrogate, acquisition) go to PhaseFieldBO."""
+    logger = logging.getLogger('benchmarks')
+    compositions, references, ions = synthetic_field(n_elements, n_entries, entry_natoms)
+    limits = {el: [0, limit] for el in ions} if limit else None
+    names = list(compositions[:, 0])
+    results = {}
+
+    results['generate'] = measure(lambda: generate(ions, names, [], Ntot, limits), repeat)
+
+    results['phase_field'] = measure(
+        lambda: PhaseField(compositions, references, ions, allow_negative=False, logger=logger), repeat)
+    pf = PhaseField(compositions, references, ions, allow_negative=False, logger=logger)
+
+    # candidates at compositions that were not computed yet
+    candidates = generate(ions, names, [], Ntot, limits)
+    candidates = [c for c, x in zip(candidates, pf.get_coordinates(candidates)) if x not in pf.index]
+    candidates = list(np.random.default_rng(0).permutation(candidates)[:n_candidates])
+
+    results['compute_convex'] = measure(lambda: pf.compute_convex(False), repeat)
+    results['get_phase_coordinates'] = measure(lambda: PhaseField.get_phase_coordinates(pf.pd, pf.formulas), repeat)
+    results['get_coordinates'] = measure(lambda: pf.get_coordinates(candidates), repeat)
+
+    np.random.seed(0)
+    bo = PhaseFieldBO(compositions, references, ions, mode='suggest', next_formulas=candidates,
+                      allow_negative=False, logger=logger, **bo_kwargs)
+    results['get_dom_phase'] = measure(bo.get_dom_phase, repeat)
+    results['setBO'] = measure(bo.setBO, repeat)
+    results['suggest_next_locations'] = measure(bo.bo.suggest_next_locations, 1)
+    return results
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            time_tolerance: float = 0.5, memory_tolerance: float = 0.2) -> list:
+    """
+    Stages slower than (1 + time_tolerance) x baseline or with more than (1 + memory_tolerance) x
+    baseline peak memory. Differences below TIME_FLOOR or MEMORY_FLOOR are treated as noise.
+    """
+    regressions = []
+    for case, stages in results.items():
+        for stage, r in stages.items():
+            base = baseline.get(case, {}).get(stage)
+            if base is None:
+                continue
+            if r['time'] > base['time'] * (1 + time_tolerance) and r['time'] - base['time'] > TIME_FLOOR:
+                regressions.append((case, stage, 'time', base['time'], r['time']))
+            if r['peak_mb'] > base['peak_mb'] * (1 + memory_tolerance) and r['peak_mb'] - base['peak_mb'] > MEMORY_FLOOR:
+                regressions.append((case, stage, 'peak_mb', base['peak_mb'], r['peak_mb']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark phasebo on synthetic phase fields.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Predefined case(s) to run (default: all)")
+    parser.add_argument("--elements", type=int, help="Custom case: number of elements (3-6)")
+    parser.add_argument("--entries", type=int, default=500, help="Custom case: number of computed entries")
+    parser.add_argument("--entry-natoms", type=int, default=12, help="Custom case: maximum atoms in computed entries")
+    parser.add_argument("--natoms", type=int, default=16, help="Custom case: N_atom of generated candidates")
+    parser.add_argument("--limit", type=int, default=None, help="Custom case: upper limit of every element amount")
+    parser.add_argument("--candidates", type=int, default=None,
+                        help="Candidates in the BO domain (default: the case's, 2000 for custom ones)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per stage (best is kept)")
+    parser.add_argument("--baseline", type=str, default=BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="Allowed relative slowdown (default: 0.5)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2, help="Allowed relative memory growth (default: 0.2)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.elements:
+        cases = {f'custom-{args.elements}el-{args.entries}': {'n_elements': args.elements, 'n_entries': args.entries,
+                                                             'entry_natoms': args.entry_natoms, 'Ntot': args.natoms,
+                                                             'limit': args.limit}}
+    else:
+        cases = {name: CASES[name] for name in (args.case or CASES)}
+
+    results = {}
+    for name, case in cases.items():
+        if args.candidates:
+            case = dict(case, n_candidates=args.candidates)
+        results[name] = run_case(**case, repeat=args.repeat)
+        for stage, r in results[name].items():
+            print(f"{name:14s} {stage:24s} {r['time'] * 1000:10.1f} ms {r['peak_mb']:9.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline in {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for case, stage, metric, base, value in regressions:
+        print(f"REGRESSION {case} {stage} {metric}: {base:.4g} -> {value:.4g}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
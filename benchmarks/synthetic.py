@@ -0,0 +1,48 @@
+import numpy as np
+from numpy import ndarray
+from typing import Dict, List, Optional, Tuple
+
+from phasebo.list_compositions import amount_blocks
+
+# Elements and oxidation states, taken in order to build 3 to 6 element fields
+IONS = [('Li', 1), ('S', -2), ('Cl', -1), ('Sn', 4), ('Mg', 2), ('O', -2)]
+
+def synthetic_ions(n_elements: int) -> Dict[str, int]:
+    if not 3 <= n_elements <= len(IONS):
+        raise ValueError(f'Synthetic fields have 3 to {len(IONS)} elements, got {n_elements}')
+    return dict(IONS[:n_elements])
+
+def entry_name(symbols: List[str], amount: ndarray) -> str:
+    """Input table style name, e.g. 'Li2 S1', without absent elements."""
+    return ' '.join(f'{s}{n}' for s, n in zip(symbols, amount) if n)
+
+def synthetic_field(n_elements: int,
+                    n_entries: int,
+                    Ntot: int = 12,
+                    limits: Optional[Dict[str, List[int]]] = None,
+                    seed: int = 0) -> Tuple[ndarray, ndarray, Dict[str, int]]:
+    """
+    A phase field with n_entries computed compositions plus elemental references, in the
+    layout of the input file: rows of (composition, total energy in eV); the references are the last rows.
+
+    Compositions are drawn from the charge-balanced ones with up to Ntot atoms (repeats, i.e. polymorphs,
+    once they run out). Total energies are the elemental references plus a random formation energy,
+    so a fraction of the entries end up on the hull.
+    """
+    rng = np.random.default_rng(seed)
+    ions = synthetic_ions(n_elements)
+    symbols = list(ions)
+    pool = np.vstack(list(amount_blocks(ions, Ntot, limits)))
+    pool = pool[(pool > 0).sum(axis=1) >= 2]
+    picks = rng.choice(len(pool), n_entries, replace=n_entries > len(pool))
+    amounts = pool[picks]
+
+    mu = rng.uniform(-5, -1, n_elements)
+    natoms = amounts.sum(axis=1)
+    formation = rng.normal(-0.3, 0.2, n_entries)
+    energies = amounts @ mu + natoms * formation
+
+    rows = [[entry_name(symbols, a), e] for a, e in zip(amounts, energies)]
+    references = [[f'{s}1', m] for s, m in zip(symbols, mu)]
+    compositions = np.array(rows + references, dtype=object)
+    return compositions, compositions[-n_elements:], ions
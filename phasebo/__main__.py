@@ -1,11 +1,19 @@
 import argparse
+import os
 import yaml
+import numpy as np
 import pandas as pd
 import time
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple, Union, TYPE_CHECKING
 
-from phasebo.phase_field_bo import PhaseFieldBO
 from phasebo.logger import get_logger
+from phasebo import trace as tracing
+from phasebo.ingest import read_table
+
+# GPyOpt, pymatgen and matplotlib are imported by the modes that need them:
+# 'generate' runs on list_compositions alone
+if TYPE_CHECKING:
+    from phasebo.phase_field_bo import PhaseFieldBO
 
 def run(
     compositions,
@@ -19,79 +27,263 @@ def run(
     log_name: str,
     logger,
     batch_size: int = 4,
+    disect: int = 4,
     limits: Optional[Dict[str, List[int]]] = None,
     next_formulas: Optional[List[str]] = None,
     exceptions: Optional[List[str]] = None,
-    allow_negative: bool = False
-) -> PhaseFieldBO:
-    """Main BO run function"""
-    bopt = PhaseFieldBO(
-        compositions=compositions,
-        references=references,
-        ions=ions,
-        mode=mode,
-        seeds_type=seeds_type,
-        n_seeds=n_seeds,
-        exclude_zeros=True,
-        Ntot=Ntot,
-        limits=limits,
-        max_iter=max_iter,
-        next_formulas=next_formulas,
-        batch=batch_size,
-        exceptions=exceptions,
-        allow_negative=allow_negative,
-        logger=logger
-    )
+    allow_negative: bool = False,
+    cache_dir: Optional[str] = None,
+    evaluator: Optional[str] = None,
+    n_parallel: Optional[int] = None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: int = 0,
+    resume: bool = False,
+    surrogate: str = 'GP',
+    num_inducing: int = 100,
+    num_features: int = 500,
+    acquisition: str = 'thompson',
+    chunk_size: int = 65536,
+    prescreen: Optional[float] = None,
+    refit_drift: float = 0.2,
+    seed: Optional[int] = None,
+    trace: Optional[str] = None,
+    plot_mode: str = 'screen',
+    plot_file: str = 'convex_hull.png',
+    posterior_mesh: Optional[int] = None,
+    posterior_file: Optional[str] = None,
+    ledger: Optional[str] = None,
+    hull_processes: Optional[int] = 1
+) -> Union['PhaseFieldBO', List[str]]:
+    """
+    Main BO run function. With trace, stage timings are logged and written to that JSON file.
+    With ledger, the observations, suggestions, posterior and stage timings of the run are recorded
+    in that SQLite file. Returns the optimiser, or the candidate formulas in 'generate' mode.
+    """
+    from phasebo.ledger import Ledger
+
+    book = Ledger(ledger) if ledger else None
+    run_id = None
+    if book is not None:
+        run_id = book.start_run('-'.join(ions), mode, dict(batch_size=batch_size, max_iter=max_iter, Ntot=Ntot,
+                                                          surrogate=surrogate, acquisition=acquisition, seed=seed))
+    if trace or book is not None:
+        tracing.enable(logger)
+    try:
+        with tracing.span('run', mode=mode, entries=len(compositions), batch=batch_size):
+            if mode == 'generate':
+                return generate_candidates(compositions, ions, Ntot, limits, exceptions, logger)
+
+            from phasebo.phase_field_bo import PhaseFieldBO
 
-    convex = bopt.plot_convex()
-    convex.show()
+            if seed is not None:
+                np.random.seed(seed)
+            bopt = PhaseFieldBO(
+                compositions=compositions,
+                references=references,
+                ions=ions,
+                mode=mode,
+                seeds_type=seeds_type,
+                n_seeds=n_seeds,
+                disect=disect,
+                exclude_zeros=True,
+                Ntot=Ntot,
+                limits=limits,
+                max_iter=max_iter,
+                next_formulas=next_formulas,
+                batch=batch_size,
+                exceptions=exceptions,
+                allow_negative=allow_negative,
+                logger=logger,
+                cache_dir=cache_dir,
+                checkpoint=checkpoint,
+                checkpoint_every=checkpoint_every,
+                resume=resume,
+                surrogate=surrogate,
+                num_inducing=num_inducing,
+                num_features=num_features,
+                acquisition=acquisition,
+                chunk_size=chunk_size,
+                prescreen=prescreen,
+                refit_drift=refit_drift,
+                seed=seed,
+                ledger=book,
+                run_id=run_id,
+                hull_processes=hull_processes
+            )
 
-    if mode == 'path':
-        bopt.bo.plot_convergence()
-        bopt.bo.plot_acquisition()
-        bopt.print_results()
-    elif mode == 'suggest':
-        bopt.print_results()
-        bopt.get_uncertainty()
+            if mode == 'campaign':
+                from phasebo.campaign import load_evaluator
+
+                if not evaluator:
+                    raise ValueError("Mode 'campaign' requires an evaluator")
+                with load_evaluator(evaluator, n_parallel or batch_size) as ev, \
+                        tracing.span('run_campaign', n_parallel=n_parallel or batch_size) as s:
+                    bopt.run_campaign(ev, n_parallel, max_iter)
+                    s.count(evaluations=len(bopt.campaign_results))
+
+            with tracing.span('plot_convex', entries=len(bopt.compositions)):
+                plot_convex(bopt, plot_mode, plot_file, logger)
+
+            with tracing.span('results', candidates=len(bopt.candidates)):
+                if mode == 'path':
+                    if plot_mode == 'screen':
+                        bopt.bo.plot_convergence()
+                        bopt.bo.plot_acquisition()
+                    elif plot_mode == 'file' and not plot_file.endswith('.npz'):
+                        root, ext = os.path.splitext(plot_file)
+                        bopt.bo.plot_convergence(filename=f"{root}_convergence{ext}")
+                    bopt.print_results()
+                elif mode in ('suggest', 'campaign'):
+                    bopt.print_results()
+                    bopt.get_uncertainty(posterior_mesh, posterior_file)
+    finally:
+        if trace or book is not None:
+            tracing.disable()
+        if trace:
+            tracing.export(trace)
+            logger.info(f"Trace written to {trace}")
+        if book is not None:
+            book.record_stages(run_id, tracing.recorded())
+            book.finish_run(run_id)
+            book.close()
+            logger.info(f"Run {run_id} recorded in {ledger}")
+        tracing.reset()
 
     return bopt
 
-def main():
-    parser = argparse.ArgumentParser(description="Run phasebo with a specified YAML configuration file.")
-    parser.add_argument(
-        "--config",
-        type=str,
-        default="input_config.yaml",
-        help="Path to YAML config file (default: input_config.yaml)"
-    )
-    args = parser.parse_args()
+def generate_candidates(compositions, ions: Dict[str, int], Ntot: int, limits: Optional[Dict[str, List[int]]],
+                        exceptions: Optional[List[str]], logger) -> List[str]:
+    """
+    'generate' mode: write the charge-balanced compositions not in the input or the exceptions to
+    candidates_list.csv, one formula (the smallest cell) per reduced composition.
+    """
+    from phasebo.list_compositions import candidate_formulas, write_candidates
 
-    with open(args.config, "r") as f:
-        cfg: Dict[str, Any] = yaml.safe_load(f)
+    logger.info("Generating candidate compositions, writing to candidates_list.csv")
+    names = candidate_formulas(ions, compositions[:, 0], exceptions, Ntot, limits)
+    write_candidates(names)
+    return names
+
+def plot_convex(bopt: 'PhaseFieldBO', plot_mode: str, plot_file: str, logger) -> None:
+    """
+    Show the convex hull plot ('screen'), write it without a display to plot_file ('file':
+    an image, or the interpolated grid for .npz) or skip it ('none').
+    """
+    if plot_mode not in ('screen', 'file', 'none'):
+        raise ValueError(f'Unsupported plot_mode: "{plot_mode}". Supported: "screen", "file", "none"')
+    if plot_mode == 'none':
+        return
+    if len(bopt.elements) not in (3, 4):
+        logger.info("Convex hull plot is available for ternary and quaternary phase fields only")
+        return
+    if plot_mode == 'screen':
+        bopt.plot_convex().show()
+    else:
+        bopt.save_convex(plot_file)
+        logger.info(f"Convex hull plot written to {plot_file}")
 
-    df = pd.read_csv(cfg["inputfile"], header=0)
-    compositions = df.values
-    references = df.values[cfg["reference_index"]:]
+def read_inputs(cfg: Dict[str, Any], tables: Optional[Dict[str, Any]] = None) \
+        -> Tuple[Any, Any, Optional[List[str]], Optional[List[str]]]:
+    """
+    Read the compositions, references, candidate formulas and exceptions named in a config.
+    Entries with elements outside the configured ions are dropped from the input table while it is read;
+    reference_index still counts the rows of the file.
+    tables holds the parsed files by path and is filled in, so that configs sharing files read them once.
+    """
+    def read_csv(path: str):
+        if tables is None:
+            return pd.read_csv(path, header=0).values
+        if path not in tables:
+            tables[path] = pd.read_csv(path, header=0).values
+        return tables[path]
+
+    key = (cfg["inputfile"], tuple(cfg["ions"]))
+    if tables is None or key not in tables:
+        table = read_table(cfg["inputfile"], list(cfg["ions"]))
+        if tables is not None:
+            tables[key] = table
+    else:
+        table = tables[key]
+    compositions, rows = table
+    references = compositions[rows >= cfg["reference_index"]]
 
     next_formulas = None
     if "compositionfile" in cfg and cfg["compositionfile"]:
         try:
-            next_formulas = [i[0] for i in pd.read_csv(cfg["compositionfile"]).values]
+            next_formulas = [i[0] for i in read_csv(cfg["compositionfile"])]
         except Exception:
             next_formulas = None
 
     exceptions = None
     if "excludefile" in cfg and cfg["excludefile"]:
         try:
-            exceptions = [i[0] for i in pd.read_csv(cfg["excludefile"]).values]
+            exceptions = [i[0] for i in read_csv(cfg["excludefile"])]
         except Exception:
             exceptions = None
 
+    return compositions, references, next_formulas, exceptions
+
+def run_arguments(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments of run() set by a config, other than the inputs, logger, resume and trace."""
+    return dict(
+        ions=cfg["ions"],
+        mode=cfg["mode"],
+        Ntot=cfg["N_atom"],
+        seeds_type=cfg["seeds_type"],
+        n_seeds=cfg["n_seeds"],
+        max_iter=cfg["max_iter"],
+        batch_size=cfg.get("batch_size", 4),
+        disect=cfg.get("disect", 4),
+        log_name=cfg["log"],
+        limits=cfg.get("limits"),
+        allow_negative=False,
+        cache_dir=cfg.get("cache_dir"),
+        evaluator=cfg.get("evaluator"),
+        n_parallel=cfg.get("n_parallel"),
+        checkpoint=cfg.get("checkpoint"),
+        checkpoint_every=cfg.get("checkpoint_every", 0),
+        surrogate=cfg.get("surrogate", "GP"),
+        num_inducing=cfg.get("num_inducing", 100),
+        num_features=cfg.get("num_features", 500),
+        acquisition=cfg.get("acquisition", "thompson"),
+        chunk_size=cfg.get("chunk_size", 65536),
+        prescreen=cfg.get("prescreen"),
+        refit_drift=cfg.get("refit_drift", 0.2),
+        seed=cfg.get("seed"),
+        plot_mode=cfg.get("plot_mode", "screen"),
+        plot_file=cfg.get("plot_file", "convex_hull.png"),
+        posterior_mesh=cfg.get("posterior_mesh"),
+        posterior_file=cfg.get("posterior_file"),
+        ledger=cfg.get("ledger"),
+        hull_processes=cfg.get("hull_processes", 1)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run phasebo with a specified YAML configuration file.")
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="input_config.yaml",
+        help="Path to YAML config file (default: input_config.yaml)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the checkpoint file given in the config"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        cfg: Dict[str, Any] = yaml.safe_load(f)
+
+    compositions, references, next_formulas, exceptions = read_inputs(cfg)
+
     # Build log file path with timestamp
     timestamp = time.strftime('%b-%d-%Y_%H%M', time.localtime())
     log_path = f"{cfg['log']}-{timestamp}.log"
 
     logger = get_logger("phasebo", log_file=log_path)
+    trace_path = f"{cfg['log']}-{timestamp}.trace.json" if cfg.get("trace") else None
 
     # Echo config nicely
     logger.info("========== CONFIGURATION ==========")
@@ -102,18 +294,12 @@ def main():
     run(
         compositions=compositions,
         references=references,
-        ions=cfg["ions"],
-        mode=cfg["mode"],
-        Ntot=cfg["N_atom"],
-        seeds_type=cfg["seeds_type"],
-        n_seeds=cfg["n_seeds"],
-        max_iter=cfg["max_iter"],
-        log_name=cfg["log"],
         logger=logger,
-        limits=cfg.get("limits"),
         next_formulas=next_formulas,
         exceptions=exceptions,
-        allow_negative=False
+        resume=args.resume or cfg.get("resume", False),
+        trace=trace_path,
+        **run_arguments(cfg)
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+import logging
+import numpy as np
+from numpy import ndarray
+from typing import Callable, Optional
+
+from GPyOpt.core.evaluators.base import EvaluatorBase
+
+from phasebo.coordinates import coordinate_keys
+
+# Odd 64-bit multipliers hashing integer coordinate keys to one int64 per row
+_HASH = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                  0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x27D4EB2F165667C5, 0x85EBCA77C2B2AE63],
+                 dtype=np.uint64)
+
+def row_hashes(X: ndarray) -> ndarray:
+    """One 64-bit hash per row of coordinates, built from their exact integer keys."""
+    keys = coordinate_keys(X).astype(np.uint64)
+    multipliers = np.resize(_HASH, keys.shape[1])
+    with np.errstate(over='ignore'):
+        return (keys * multipliers).sum(axis=1, dtype=np.uint64)
+
+def thompson_batch(model,
+                   domain: ndarray,
+                   batch_size: int,
+                   excluded: Optional[ndarray] = None,
+                   chunk_size: int = 65536,
+                   prescreen: Optional[float] = None,
+                   normal: Callable = np.random.normal) -> ndarray:
+    """
+    Indices of batch_size rows of domain chosen by marginal Thompson sampling (lowest sample wins).
+
+    Every batch slot draws its own independent sample over the whole domain. The domain is scored in
+    chunks of chunk_size rows and each slot keeps a running top-batch_size, so memory is bounded by the
+    chunk size rather than the domain size. The slots are then filled greedily with distinct rows.
+
+    With prescreen = z, rows whose posterior mean minus z standard deviations cannot beat the current
+    top-k of any slot are dropped before sampling, which saves drawing and ranking batch_size samples
+    for the bulk of a large domain.
+    Rows in excluded (observed, pending or ignored points) are never chosen.
+    """
+    k = batch_size
+    best_values = np.full((batch_size, k), np.inf)
+    best_rows = np.full((batch_size, k), -1, dtype=np.int64)
+    excluded_hashes = row_hashes(excluded) if excluded is not None and len(excluded) else None
+
+    for start in range(0, len(domain), chunk_size):
+        X = domain[start:start + chunk_size]
+        rows = np.arange(start, start + len(X))
+        if excluded_hashes is not None:
+            keep = ~np.isin(row_hashes(X), excluded_hashes)
+            X, rows = X[keep], rows[keep]
+        if not len(X):
+            continue
+        mean, std = model.predict(X)
+        if prescreen is not None and np.isfinite(best_values[:, -1]).all():
+            keep = (mean - prescreen * std)[:, 0] < best_values[:, -1].max()
+            mean, std, rows = mean[keep], std[keep], rows[keep]
+        samples = normal(mean, std, size=(len(rows), batch_size))
+        for slot in range(batch_size):
+            values = np.concatenate([best_values[slot], samples[:, slot]])
+            candidates = np.concatenate([best_rows[slot], rows])
+            top = np.argpartition(values, k - 1)[:k] if len(values) > k else np.arange(len(values))
+            top = top[np.argsort(values[top])]
+            best_values[slot], best_rows[slot] = values[top], candidates[top]
+
+    chosen = []
+    for slot in range(batch_size):
+        for row in best_rows[slot]:
+            if row >= 0 and row not in chosen:
+                chosen.append(row)
+                break
+    return np.array(chosen, dtype=np.int64)
+
+class ChunkedThompsonBatch(EvaluatorBase):
+    """
+    GPyOpt batch evaluator for a single bandit variable: marginal Thompson sampling over the
+    whole bandit domain in memory-bounded chunks (see thompson_batch). Observed, pending and
+    ignored points known to the duplicate manager are excluded.
+    """
+
+    def __init__(self, acquisition, batch_size: int, chunk_size: int = 65536, prescreen: Optional[float] = None):
+        super().__init__(acquisition, batch_size)
+        self.model = acquisition.model
+        self.space = acquisition.space
+        self.chunk_size = chunk_size
+        self.prescreen = prescreen
+
+    def compute_batch(self, duplicate_manager=None, context_manager=None) -> ndarray:
+        domain = self.space.space_expanded[0].domain
+        excluded = np.array(list(duplicate_manager.unique_points)) if duplicate_manager else None
+        rows = thompson_batch(self.model, domain, self.batch_size, excluded, self.chunk_size, self.prescreen)
+        if len(rows) < self.batch_size:
+            logging.getLogger(__name__).warning(
+                f"The batch of requested size {self.batch_size} could not be entirely filled in (only {len(rows)} points)")
+        return domain[rows]
@@ -0,0 +1,181 @@
+import argparse
+import glob
+import logging
+import os
+import time
+import yaml
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Sequence, Tuple
+
+from phasebo.__main__ import read_inputs, run, run_arguments
+from phasebo.ingest import field_rows, read_table
+from phasebo.logger import get_logger
+
+# Input files of a config, resolved relative to the config's directory
+INPUT_FILES = ('inputfile', 'compositionfile', 'excludefile', 'evaluator')
+
+def config_files(paths: Sequence[str]) -> List[str]:
+    """YAML configs given directly or found in the given directories (sorted)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '*.yaml')) + glob.glob(os.path.join(path, '*.yml')))
+        else:
+            files.append(path)
+    return files
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Read a config; relative input files are taken relative to the config's directory."""
+    with open(path, 'r') as f:
+        cfg: Dict[str, Any] = yaml.safe_load(f)
+    root = os.path.dirname(os.path.abspath(path))
+    for key in INPUT_FILES:
+        value = cfg.get(key)
+        # 'module:function' evaluators are not files
+        if isinstance(value, str) and value and (key != 'evaluator' or value.endswith('.csv')):
+            cfg[key] = os.path.join(root, value)
+    return cfg
+
+def field_references(references: np.ndarray, ions: Dict[str, float]) -> np.ndarray:
+    """Rows of a shared reference table whose elements all belong to the phase field."""
+    return references[field_rows(references[:, 0].astype(str), list(ions))]
+
+def with_references(compositions: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """Input table with its own entries for the reference compositions replaced by the shared ones."""
+    names = {str(r).strip() for r in references[:, 0]}
+    own = np.array([str(c).strip() not in names for c in compositions[:, 0]], dtype=bool)
+    return np.vstack([compositions[own, :2], references[:, :2]])
+
+def field_logger(name: str, log_file: str) -> logging.Logger:
+    """Logger of one field writing to its own file only, so that parallel fields do not interleave."""
+    logger = logging.getLogger(f'{__name__}.{name}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(handler)
+    return logger
+
+def field_summary(bopt, mode: str) -> Dict[str, Any]:
+    """
+    Entries, candidates and suggested (or, in 'path' mode, visited) compositions of a finished run,
+    from its optimiser or, in 'generate' mode, its candidate formulas.
+    """
+    if mode == 'generate':
+        return {'entries': None, 'candidates': len(bopt), 'suggestions': ''}
+    if mode == 'path':
+        rows = bopt.index.lookup_many(bopt.bo.X)[len(bopt.nseeds):]
+        suggestions = [bopt.compositions[r] for r in rows]
+        candidates = len(bopt.candidates)
+    elif mode == 'campaign':
+        suggestions = [formula for formula, _ in bopt.campaign_results]
+        candidates = len(bopt.next_formulas) + len(suggestions)
+    else:
+        suggestions = [bopt.next_formulas[bopt.next_index.lookup(x)] for x in bopt.next]
+        candidates = len(bopt.next_formulas)
+    return {'entries': len(bopt.compositions), 'candidates': candidates, 'suggestions': ' '.join(suggestions)}
+
+def run_field(task: Tuple[str, str, Dict[str, Any], Any, Any, Optional[List[str]], Optional[List[str]], bool]) \
+        -> Dict[str, Any]:
+    """
+    Run one phase field in its own working directory, where all its outputs go.
+    Failures are reported in the summary row instead of stopping the batch.
+    """
+    name, workdir, cfg, compositions, references, next_formulas, exceptions, resume = task
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    timestamp = time.strftime('%b-%d-%Y_%H%M', time.localtime())
+    logger = field_logger(name, f"{os.path.basename(cfg['log'])}-{timestamp}.log")
+
+    arguments = run_arguments(cfg)
+    # never block a worker on a plot window
+    if arguments['plot_mode'] == 'screen':
+        arguments['plot_mode'] = 'none'
+
+    row = {'field': name, 'mode': cfg['mode'], 'status': 'done'}
+    start = time.perf_counter()
+    try:
+        bopt = run(compositions=compositions, references=references, logger=logger, next_formulas=next_formulas,
+                   exceptions=exceptions, resume=resume or cfg.get('resume', False), **arguments)
+        row.update(field_summary(bopt, cfg['mode']))
+    except Exception as err:
+        logger.exception(f"Phase field {name} failed")
+        row.update(status='failed', error=f'{type(err).__name__}: {err}')
+    row['wall_time'] = time.perf_counter() - start
+    return row
+
+def prepare_tasks(configs: Sequence[str], output_dir: str, references: Optional[np.ndarray] = None,
+                  resume: bool = False) -> List[Tuple]:
+    """
+    One task per config. Input tables shared between configs are parsed once; with a shared reference
+    table, each field gets the references of its own elements in place of those in its input file.
+    """
+    tables: Dict[str, Any] = {}
+    tasks, names = [], set()
+    for path in configs:
+        cfg = load_config(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in names:
+            name = f'{name}-{len(tasks)}'
+        names.add(name)
+
+        compositions, own_references, next_formulas, exceptions = read_inputs(cfg, tables)
+        if references is not None:
+            own_references = field_references(references, cfg['ions'])
+            compositions = with_references(compositions, own_references)
+        tasks.append((name, os.path.abspath(os.path.join(output_dir, name)), cfg, compositions, own_references,
+                      next_formulas, exceptions, resume))
+    return tasks
+
+def run_batch(configs: Sequence[str], output_dir: str = 'batch', processes: Optional[int] = None,
+              references: Optional[np.ndarray] = None, resume: bool = False) -> pd.DataFrame:
+    """
+    Run every config in a process pool of at most `processes` workers (1: in this process) and return one
+    summary row per phase field, in config order. Workers are reused, so the GP and pymatgen stack is imported
+    once per worker rather than once per field.
+    """
+    tasks = prepare_tasks(configs, output_dir, references, resume)
+    if processes == 1:
+        cwd = os.getcwd()
+        try:
+            rows = [run_field(task) for task in tasks]
+        finally:
+            os.chdir(cwd)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rows = list(pool.map(run_field, tasks))
+    columns = ['field', 'mode', 'status', 'wall_time', 'entries', 'candidates', 'suggestions', 'error']
+    return pd.DataFrame(rows).reindex(columns=columns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run phasebo on many phase fields (configs) in a process pool.")
+    parser.add_argument("configs", nargs="+", help="YAML config files and/or directories of them")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output-dir", type=str, default="batch", help="Directory of per-field outputs (default: batch)")
+    parser.add_argument("--references", type=str, default=None,
+                        help="Table (.csv, .parquet, .npz, ...) of reference compositions and total energies shared by all fields")
+    parser.add_argument("--summary", type=str, default="batch_summary.csv", help="Summary CSV (default: batch_summary.csv)")
+    parser.add_argument("--resume", action="store_true", help="Resume every field from its checkpoint")
+    args = parser.parse_args()
+
+    logger = get_logger("phasebo")
+    configs = config_files(args.configs)
+    references = read_table(args.references)[0] if args.references else None
+
+    start = time.perf_counter()
+    summary = run_batch(configs, args.output_dir, args.processes, references, args.resume)
+    summary.to_csv(args.summary, index=False)
+
+    failed = summary[summary['status'] == 'failed']
+    logger.info(f"{len(summary)} phase fields in {round(time.perf_counter() - start, 1)} s, {len(failed)} failed")
+    for _, row in failed.iterrows():
+        logger.info(f"{row['field']}: {row['error']}")
+    logger.info(f"Summary written to {args.summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from numpy import ndarray
+from typing import Dict, List, Optional, Tuple, Any
+
+# Bump whenever the layout or meaning of the cached arrays changes
+CACHE_VERSION = 1
+
+def field_key(compositions: ndarray,
+              ions: Dict[str, float],
+              exceptions: Optional[List[str]] = None,
+              allow_negative: bool = False) -> str:
+    """
+    Content hash of everything the derived phase field state depends on:
+    the composition/energy table, the ions (in order), the exceptions and allow_negative.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        'version': CACHE_VERSION,
+        'ions': [[el, float(q)] for el, q in ions.items()],
+        'exceptions': sorted(str(e).strip() for e in (exceptions or [])),
+        'allow_negative': bool(allow_negative),
+    }).encode())
+    h.update('\n'.join(str(c).strip() for c in compositions[:, 0]).encode())
+    h.update(np.asarray(compositions[:, 1], dtype=float).tobytes())
+    return h.hexdigest()
+
+def array_key(*arrays: ndarray, **params) -> str:
+    """
+    Content hash of arrays (shape, dtype and data) and JSON-serialisable parameters.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(dict(params, version=CACHE_VERSION), sort_keys=True).encode())
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f'{a.dtype.str}{a.shape}'.encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+def cache_path(cache_dir: str, key: str, kind: str = 'field') -> str:
+    return os.path.join(cache_dir, f'{kind}-{key[:32]}.npz')
+
+def save_arrays(path: str, arrays: Dict[str, ndarray], meta: Dict[str, Any]) -> None:
+    """
+    Atomically write arrays plus JSON metadata to a compressed npz file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    meta = dict(meta, version=CACHE_VERSION)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, _meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def load_arrays(path: str, key: Optional[str] = None) -> Optional[Tuple[Dict[str, ndarray], Dict[str, Any]]]:
+    """
+    Read arrays and metadata written by save_arrays.
+    Returns None if the file is missing, unreadable, from another cache version or for another key.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['_meta']))
+            arrays = {k: data[k] for k in data.files if k != '_meta'}
+    except Exception:
+        return None
+    if meta.get('version') != CACHE_VERSION or (key is not None and meta.get('key') != key):
+        return None
+    return arrays, meta
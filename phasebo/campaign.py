@@ -0,0 +1,92 @@
+import importlib
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from phasebo.coordinates import parse_formula, coordinate_keys
+
+class Evaluator(ABC):
+    """
+    Interface between a campaign and whatever computes total energies (DFT, a cluster queue, a table).
+    submit() must return immediately with a Future resolving to the total energy (eV) of the formula;
+    a Future that raises marks the formula as failed.
+    """
+
+    @abstractmethod
+    def submit(self, formula: str) -> Future:
+        ...
+
+    def shutdown(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Evaluator':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+class ProcessPoolEvaluator(Evaluator):
+    """Run a picklable energy function, formula -> total energy in eV, in a local process pool."""
+
+    def __init__(self, function: Callable[[str], float], max_workers: Optional[int] = None) -> None:
+        self.function = function
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.futures: List[Future] = []
+
+    def submit(self, formula: str) -> Future:
+        self.futures = [f for f in self.futures if not f.done()]
+        future = self.executor.submit(self.function, formula)
+        self.futures.append(future)
+        return future
+
+    def shutdown(self) -> None:
+        # evaluations not started yet are dropped (shutdown's cancel_futures needs Python 3.9)
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+class TableEnergy:
+    """
+    Stand-in for DFT: total energies looked up from a table of compositions and total energies
+    (same layout as the input file). Formulas are matched by atomic fractions and the lowest energy
+    per atom tabulated for that composition is scaled to the number of atoms in the requested formula.
+    Unknown compositions raise KeyError.
+    """
+
+    def __init__(self, path: str) -> None:
+        table = pd.read_csv(path, header=0).values
+        self.energies: Dict[Tuple, float] = {}
+        for name, energy in zip(table[:, 0], table[:, 1]):
+            key, natoms = self.key(str(name))
+            self.energies[key] = min(self.energies.get(key, np.inf), float(energy) / natoms)
+
+    @staticmethod
+    def key(formula: str) -> Tuple[Tuple, float]:
+        amounts = {el: n for el, n in parse_formula(formula).items() if n}
+        natoms = sum(amounts.values())
+        elements = sorted(amounts)
+        fractions = coordinate_keys(np.array([[amounts[el] / natoms for el in elements]]))[0]
+        return tuple(zip(elements, fractions.tolist())), natoms
+
+    def __call__(self, formula: str) -> float:
+        key, natoms = self.key(formula)
+        if key not in self.energies:
+            raise KeyError(f'No tabulated energy for {formula}')
+        return self.energies[key] * natoms
+
+def load_evaluator(spec: str, max_workers: Optional[int] = None) -> Evaluator:
+    """
+    Build an evaluator from a configuration string: either a table of compositions and
+    total energies (*.csv) or an importable energy function given as 'package.module:function'.
+    """
+    if spec.endswith('.csv'):
+        function = TableEnergy(spec)
+    elif ':' in spec:
+        module, name = spec.split(':', 1)
+        function = getattr(importlib.import_module(module), name)
+    else:
+        raise ValueError(f'Unsupported evaluator: "{spec}". Supported: "<table>.csv", "<module>:<function>"')
+    return ProcessPoolEvaluator(function, max_workers)
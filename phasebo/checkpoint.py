@@ -0,0 +1,33 @@
+import random
+import numpy as np
+from numpy import ndarray
+from typing import Dict, Optional, Tuple, Any
+
+from phasebo.cache import save_arrays, load_arrays
+
+def get_rng_state() -> Tuple[Dict[str, ndarray], Dict[str, Any]]:
+    """
+    State of the global numpy (used by GPyOpt) and python (used for seed selection) generators,
+    split into arrays and JSON-serialisable metadata.
+    """
+    _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    version, state, gauss_next = random.getstate()
+    arrays = {'np_rng_keys': keys, 'py_rng_state': np.array(state, dtype=np.int64)}
+    meta = {'np_rng': [int(pos), int(has_gauss), float(cached_gaussian)],
+            'py_rng': [version, gauss_next]}
+    return arrays, meta
+
+def set_rng_state(arrays: Dict[str, ndarray], meta: Dict[str, Any]) -> None:
+    pos, has_gauss, cached_gaussian = meta['np_rng']
+    np.random.set_state(('MT19937', arrays['np_rng_keys'], pos, has_gauss, cached_gaussian))
+    version, gauss_next = meta['py_rng']
+    random.setstate((version, tuple(int(s) for s in arrays['py_rng_state']), gauss_next))
+
+def save_checkpoint(path: str, arrays: Dict[str, ndarray], meta: Dict[str, Any]) -> None:
+    """Atomically write a checkpoint together with the current RNG state."""
+    rng_arrays, rng_meta = get_rng_state()
+    save_arrays(path, dict(arrays, **rng_arrays), dict(meta, **rng_meta))
+
+def load_checkpoint(path: str) -> Optional[Tuple[Dict[str, ndarray], Dict[str, Any]]]:
+    """Read a checkpoint written by save_checkpoint; None if missing or unreadable."""
+    return load_arrays(path)
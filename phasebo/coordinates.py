@@ -0,0 +1,140 @@
+import re
+import numpy as np
+from numpy import ndarray
+from typing import Dict, List, Optional, Sequence, Tuple
+
+FORMULA_TOKEN = re.compile(r'([A-Z][a-z]?)\s*([0-9]*\.?[0-9]*)')
+
+def parse_formula(formula: str) -> Dict[str, float]:
+    """
+    Parse a flat formula such as 'Li2Sn0S1Cl0' or 'Cl3 Li1 Sn1 S1' into element amounts.
+    Formulas with brackets are delegated to pymatgen.
+    """
+    if '(' in formula or '[' in formula:
+        from pymatgen.core.composition import Composition
+        return {str(el): amt for el, amt in Composition(formula).items()}
+
+    amounts: Dict[str, float] = {}
+    for symbol, n in FORMULA_TOKEN.findall(formula):
+        amounts[symbol] = amounts.get(symbol, 0) + (float(n) if n else 1.0)
+    return amounts
+
+def parse_formulas(formulas: Sequence[str]) -> Tuple[ndarray, List[str]]:
+    """
+    Parse many formulas at once into a matrix of element amounts, one row per formula.
+    Each distinct formula is parsed only once. Returns the matrix and the elements of its columns.
+    """
+    import pandas as pd
+
+    codes, unique = pd.factorize(pd.Series(formulas, dtype=object).astype(str))
+    column: Dict[str, int] = {}
+    rows, columns, counts = [], [], []
+    for row, formula in enumerate(unique):
+        for el, n in parse_formula(formula).items():
+            rows.append(row)
+            columns.append(column.setdefault(el, len(column)))
+            counts.append(n)
+    amounts = np.zeros((len(unique), len(column)))
+    amounts[rows, columns] = counts
+    return amounts[codes], list(column)
+
+def amount_matrix(formulas: Sequence[str], elements: List[str]) -> ndarray:
+    """
+    Matrix of element amounts, one row per formula and one column per element.
+    """
+    if not len(formulas):
+        return np.zeros((0, len(elements)))
+    parsed, found = parse_formulas(formulas)
+    foreign = [j for j, el in enumerate(found) if el not in elements]
+    if foreign:
+        bad = np.flatnonzero((parsed[:, foreign] != 0).any(axis=1))
+        if len(bad):
+            raise ValueError(f"{formulas[bad[0]]} has elements not in the phase field {', '.join(elements)}")
+    amounts = np.zeros((len(formulas), len(elements)))
+    known = [j for j, el in enumerate(found) if el in elements]
+    amounts[:, [elements.index(found[j]) for j in known]] = parsed[:, known]
+    return amounts
+
+def simplex_coordinates(amounts: ndarray) -> ndarray:
+    """
+    Reduced simplex coordinates (atomic fractions of all but the first element)
+    for a matrix of element amounts, as in PhaseDiagram.pd_coords.
+    """
+    amounts = np.abs(np.asarray(amounts, dtype=float))
+    return (amounts / amounts.sum(axis=1)[:, None])[:, 1:]
+
+# Simplex coordinates are rationals with small denominators (at most the number
+# of atoms in the cell), so scaling by 2**20 and rounding maps every coordinate
+# to a unique integer far from any rounding boundary, whatever the last bit of
+# floating point error.
+KEY_SCALE = 2 ** 20
+
+def coordinate_keys(coords: ndarray) -> ndarray:
+    """
+    Exact integer keys for rows of simplex coordinates.
+    """
+    return np.rint(np.atleast_2d(np.asarray(coords, dtype=float)) * KEY_SCALE).astype(np.int64)
+
+def distinct_compositions(amounts: ndarray, known: Optional[ndarray] = None) -> ndarray:
+    """
+    Rows of an amount matrix that are distinct compositions, in input order: of the multiples of one reduced
+    composition (Li2 S1, Li4 S2) only the one with the fewest atoms, the first one on ties.
+    Rows with the composition of a row of known (amounts of the same elements) are left out.
+    """
+    known = np.zeros((0, amounts.shape[1])) if known is None else known
+    if not len(amounts):
+        return np.array([], dtype=np.int64)
+    keys = coordinate_keys(simplex_coordinates(np.vstack([known, amounts])))
+    _, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.ravel()
+    computed, group = group[:len(known)], group[len(known):]
+    order = np.lexsort((amounts.sum(axis=1), group))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = group[order][1:] != group[order][:-1]
+    rows = np.sort(order[first])
+    return rows[~np.isin(group[rows], computed)]
+
+class CoordinateIndex:
+    """
+    Hash index from simplex coordinates to row numbers of the array it was built from.
+    If several rows share coordinates, the one with the lowest energy (or the first one) is kept.
+    """
+
+    def __init__(self, coords: ndarray, energies: Optional[ndarray] = None):
+        self.rows: Dict[bytes, int] = {}
+        for i, key in enumerate(coordinate_keys(coords) if len(coords) else []):
+            key = key.tobytes()
+            j = self.rows.get(key)
+            if j is None or (energies is not None and energies[i] < energies[j]):
+                self.rows[key] = i
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, x) -> bool:
+        return self.lookup(x) >= 0
+
+    def lookup(self, x: ndarray) -> int:
+        """
+        Row number for coordinates x, or -1 if they are not indexed.
+        """
+        return self.rows.get(coordinate_keys(np.ravel(x))[0].tobytes(), -1)
+
+    def lookup_many(self, X: ndarray) -> ndarray:
+        """
+        Row numbers for each row of X, -1 where not indexed.
+        """
+        return np.array([self.rows.get(k.tobytes(), -1) for k in coordinate_keys(X)], dtype=int)
+
+    def update(self, coords: ndarray, energies: ndarray, rows: ndarray):
+        """
+        Re-index the given rows of coords, e.g. after they were appended or their energies changed.
+        """
+        groups: Dict[bytes, List[int]] = {}
+        for i, key in zip(rows, coordinate_keys(coords[rows]) if len(rows) else []):
+            groups.setdefault(key.tobytes(), []).append(int(i))
+        for key, group in groups.items():
+            j = self.rows.get(key)
+            if j is not None and j not in group:
+                group.append(j)
+            self.rows[key] = min(sorted(group), key=lambda i: energies[i])
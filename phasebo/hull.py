@@ -0,0 +1,196 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from numpy import ndarray
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from scipy.spatial import ConvexHull
+from scipy.spatial import QhullError
+
+# Same tolerances PhaseDiagram uses to discard degenerate (vertical) facets
+# and entries that cannot be stable (formation energy not negative)
+FACET_TOL = 1e-14
+FORMATION_TOL = 1e-11
+
+# Entries of the full phase field per pruning hull (see subsystem_hull)
+HULL_CHUNK = 2000
+
+def facet_planes(qhull_data: ndarray, facets: List) -> ndarray:
+    """
+    Hyperplanes through hull facets, one row per facet.
+    qhull_data has reduced simplex coordinates in all but the last column and energy per atom in the last;
+    the energy on facet f at coordinates x is np.append(x, 1) @ planes[f].
+    """
+    vertices = np.asarray(qhull_data, dtype=float)[np.asarray(facets, dtype=int)]
+    lhs = vertices.copy()
+    lhs[:, :, -1] = 1
+    return np.linalg.solve(lhs, vertices[:, :, -1:])[:, :, 0]
+
+def lower_facets(coords: ndarray, energies: ndarray) -> Tuple[ndarray, ndarray]:
+    """
+    Facets of the lower convex hull of points with reduced simplex coordinates and energies per atom,
+    as rows of point indices, and the hull data (coordinates and energies, one row per point).
+    Follows PhaseDiagram: an extra point above the field keeps the hull full-dimensional,
+    facets through it and vertical facets are dropped.
+    """
+    data = np.column_stack([coords, energies])
+    dim = data.shape[1]
+    if dim == 1:
+        return np.array([[np.argmin(data[:, 0])]]), data
+
+    extra = np.full(dim, 1 / dim)
+    extra[-1] = np.max(data) + 1
+    data = np.vstack([data, extra])
+
+    facets = []
+    for facet in ConvexHull(data, qhull_options="Qt i").simplices:
+        if max(facet) == len(data) - 1:
+            continue
+        mat = data[facet].copy()
+        mat[:, -1] = 1
+        if abs(np.linalg.det(mat)) > FACET_TOL:
+            facets.append(facet)
+    return np.array(facets, dtype=int).reshape(-1, dim), data[:-1]
+
+def lower_hull_planes(coords: ndarray, energies: ndarray) -> ndarray:
+    """Hyperplanes of the lower convex hull of points with reduced simplex coordinates and energies per atom."""
+    facets, data = lower_facets(coords, energies)
+    if data.shape[1] == 1:
+        return np.array([[data[:, 0].min()]])
+    return facet_planes(data, facets)
+
+def hull_vertices(task: Tuple[ndarray, ndarray]) -> ndarray:
+    """
+    Indices of the points (coordinates, energies) on the lower hull, i.e. those PhaseDiagram would call stable.
+    If Qhull fails, all points are returned: the caller only uses them to prune.
+    """
+    coords, energies = task
+    try:
+        facets, _ = lower_facets(coords, energies)
+    except QhullError:
+        return np.arange(len(energies))
+    return np.unique(facets)
+
+def map_tasks(tasks: List[Tuple[ndarray, ndarray]], pool: Optional[ProcessPoolExecutor]) -> List[ndarray]:
+    if pool is None or len(tasks) < 2:
+        return [hull_vertices(task) for task in tasks]
+    return list(pool.map(hull_vertices, tasks))
+
+def subsystem_hull(amounts: ndarray, energies: ndarray, processes: Optional[int] = 1, chunk_size: int = HULL_CHUNK,
+                   elements: Optional[Sequence[str]] = None) -> Tuple[ndarray, ndarray]:
+    """
+    Stable rows and facet planes of the convex hull of entries with element amounts (one column per element,
+    the first element's fraction left out of the coordinates) and energies per atom, one entry per composition.
+    Gives the stable entries and hull of PhaseDiagram without building it.
+
+    A vertex of the full hull is a vertex of the hull of its own chemical subsystem (the elements it contains),
+    so subsystems are solved from the binaries up, each from its own entries and the stable entries of the
+    subsystems below it; subsystems with the same number of elements are independent and run in a pool
+    of `processes` worker processes (1 or fewer: in this process, None: all cores). Entries of the full field are first
+    pruned in chunks of chunk_size, each against the stable boundary entries, in the same pool.
+    The final hull is built over the surviving entries only. elements (of the columns) name missing terminal entries.
+    """
+    n, dim = amounts.shape
+    fractions = amounts / amounts.sum(axis=1)[:, None]
+    support = (amounts > 0) @ (1 << np.arange(dim))
+    terminal = {}
+    for j in range(dim):
+        rows = np.flatnonzero(support == 1 << j)
+        if len(rows):
+            terminal[j] = rows[np.argmin(energies[rows])]
+    if len(terminal) < dim:
+        missing = [elements[j] if elements else j for j in range(dim) if j not in terminal]
+        raise ValueError(f"Missing terminal entries for elements {missing}")
+    references = np.array([terminal[j] for j in range(dim)])
+    if dim == 1:
+        return references, np.array([[energies[references[0]]]])
+
+    # entries above the elemental references cannot be stable
+    formation = energies - fractions @ energies[references]
+    keep = np.flatnonzero(formation < -FORMATION_TOL)
+    stable: Dict[int, ndarray] = {1 << j: np.array([references[j]]) for j in range(dim)}
+    full = (1 << dim) - 1
+    groups: Dict[int, ndarray] = {}
+    for s in np.unique(support[keep]):
+        groups[int(s)] = keep[support[keep] == s]
+
+    def below(s: int) -> ndarray:
+        return np.concatenate([rows for t, rows in stable.items() if t != s and t & ~s == 0])
+
+    def task(s: int, rows: ndarray) -> Tuple[ndarray, ndarray]:
+        columns = [j for j in range(dim) if s >> j & 1]
+        return fractions[np.ix_(rows, columns[1:])], energies[rows]
+
+    pool = ProcessPoolExecutor(max_workers=processes) if processes is None or processes > 1 else None
+    try:
+        for size in range(2, dim):
+            level = [s for s in groups if bin(s).count('1') == size]
+            candidates = [np.unique(np.concatenate([groups[s], below(s)])) for s in level]
+            vertices = map_tasks([task(s, rows) for s, rows in zip(level, candidates)], pool)
+            for s, rows, v in zip(level, candidates, vertices):
+                stable[s] = rows[v]
+
+        boundary = np.unique(below(full))
+        inner = groups.get(full, np.array([], dtype=int))
+        if len(inner) > chunk_size:
+            chunks = [np.concatenate([inner[i:i + chunk_size], boundary]) for i in range(0, len(inner), chunk_size)]
+            survivors = map_tasks([task(full, rows) for rows in chunks], pool)
+            inner = np.unique(np.concatenate([rows[v] for rows, v in zip(chunks, survivors)]))
+            inner = inner[support[inner] == full]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    rows = np.concatenate([boundary, inner])
+    facets, data = lower_facets(fractions[rows, 1:], energies[rows])
+    return np.sort(rows[np.unique(facets)]), facet_planes(data, facets)
+
+def hull_energies(coords: ndarray, planes: ndarray, chunk_size: int = 4096) -> ndarray:
+    """
+    Energy of the lower hull at each row of coords.
+    The lower hull is convex, so its value is the maximum over all facet planes;
+    rows are evaluated in chunks to bound the size of the point-by-facet matrix.
+    """
+    coords = np.atleast_2d(coords)
+    energies = np.empty(len(coords))
+    for start in range(0, len(coords), chunk_size):
+        chunk = coords[start:start + chunk_size]
+        energies[start:start + chunk_size] = (chunk @ planes[:, :-1].T + planes[:, -1]).max(axis=1)
+    return energies
+
+def equilibrium_reaction_energies(amounts: ndarray, energies: ndarray) -> ndarray:
+    """
+    Equilibrium reaction energies (eV/atom) of stable phases, i.e. their energy relative to
+    the hull of the other stable phases in their own chemical subspace.
+
+    amounts and energies (per atom) describe the stable phases only, one row per phase.
+    Returns NaN where the subspace hull could not be built.
+    """
+    support = amounts > 0
+    fractions = amounts / amounts.sum(axis=1)[:, None]
+    reaction = np.zeros(len(amounts))
+    for i, space in enumerate(support):
+        if space.sum() < 2:
+            continue
+        # competing phases: everything in the subspace except the phase itself (and its duplicates)
+        others = np.flatnonzero(~np.any(support[:, ~space], axis=1) & np.any(fractions != fractions[i], axis=1))
+        columns = np.flatnonzero(space)
+        try:
+            planes = lower_hull_planes(fractions[np.ix_(others, columns[1:])], energies[others])
+            reaction[i] = energies[i] - hull_energies(fractions[i, columns[1:]], planes)[0]
+        except Exception:
+            reaction[i] = np.nan
+    return reaction
+
+def points_in_facets(coords: ndarray, qhull_data: ndarray, facets: List, tol: float = 1e-9) -> ndarray:
+    """
+    Boolean mask of rows of coords lying inside (or on the boundary of) any of the given facets.
+    """
+    coords = np.atleast_2d(coords)
+    inside = np.zeros(len(coords), dtype=bool)
+    points = np.vstack([coords.T, np.ones(len(coords))])
+    for facet in facets:
+        vertices = np.asarray(qhull_data, dtype=float)[np.asarray(facet, dtype=int), :-1]
+        simplex = np.vstack([vertices.T, np.ones(len(facet))])
+        bary = np.linalg.solve(simplex, points)
+        inside |= np.all(bary >= -tol, axis=0)
+    return inside
@@ -0,0 +1,113 @@
+import argparse
+import os
+import numpy as np
+from numpy import ndarray
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from phasebo.coordinates import parse_formulas
+
+# Rows read and parsed at once; bounds the memory of the intermediate chunks
+CHUNK_SIZE = 1_000_000
+
+def field_rows(names: Sequence[str], elements: Sequence[str]) -> ndarray:
+    """Flags for formulas whose elements (with nonzero amounts) all belong to the phase field."""
+    amounts, found = parse_formulas(names)
+    foreign = [j for j, el in enumerate(found) if el not in elements]
+    return ~(amounts[:, foreign] != 0).any(axis=1)
+
+def csv_chunks(path: str, chunk_size: int) -> Iterator[Tuple[ndarray, ndarray]]:
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, header=0, usecols=[0, 1], chunksize=chunk_size):
+        yield chunk.iloc[:, 0].to_numpy(dtype=str), chunk.iloc[:, 1].to_numpy(dtype=float)
+
+def arrow_chunks(path: str, chunk_size: int) -> Iterator[Tuple[ndarray, ndarray]]:
+    try:
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"Reading {path} requires pyarrow: pip install pyarrow")
+
+    if path.endswith('.parquet'):
+        source = pyarrow.parquet.ParquetFile(path)
+        columns = source.schema_arrow.names[:2]
+        batches = source.iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        source = pyarrow.ipc.open_file(path)
+        batches = (source.get_batch(i) for i in range(source.num_record_batches))
+    for batch in batches:
+        yield batch.column(0).to_numpy(zero_copy_only=False).astype(str), \
+              batch.column(1).to_numpy(zero_copy_only=False).astype(float)
+
+def numpy_chunks(path: str, chunk_size: int) -> Iterator[Tuple[ndarray, ndarray]]:
+    """
+    .npz with 'compositions' and 'energies' arrays (as written by save_table),
+    or .npy with a structured array whose first two fields are the compositions and energies.
+    """
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as data:
+            names, energies = data['compositions'], data['energies']
+    else:
+        data = np.load(path, mmap_mode='r', allow_pickle=False)
+        names, energies = data[data.dtype.names[0]], data[data.dtype.names[1]]
+    for start in range(0, len(names), chunk_size):
+        yield np.asarray(names[start:start + chunk_size], dtype=str), \
+              np.asarray(energies[start:start + chunk_size], dtype=float)
+
+def table_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[ndarray, ndarray]]:
+    """Compositions and total energies of a table file in chunks of at most chunk_size rows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.arrow', '.feather'):
+        return arrow_chunks(path, chunk_size)
+    if ext in ('.npz', '.npy'):
+        return numpy_chunks(path, chunk_size)
+    return csv_chunks(path, chunk_size)
+
+def read_table(path: str, elements: Optional[Sequence[str]] = None,
+               chunk_size: int = CHUNK_SIZE) -> Tuple[ndarray, ndarray]:
+    """
+    Read a table of compositions and total energies: CSV (read in chunks), Parquet/Arrow (needs pyarrow)
+    or .npz/.npy. With elements, rows with other elements are dropped chunk by chunk, before they are kept.
+    Returns the table (object array of names and energies, one row per entry) and the positions of its rows
+    in the file.
+    """
+    names: List[ndarray] = []
+    energies: List[ndarray] = []
+    rows: List[ndarray] = []
+    start = 0
+    for chunk_names, chunk_energies in table_chunks(path, chunk_size):
+        chunk_names = np.char.strip(chunk_names)
+        position = np.arange(start, start + len(chunk_names))
+        start += len(chunk_names)
+        if elements is not None and len(chunk_names):
+            keep = field_rows(chunk_names, elements)
+            chunk_names, chunk_energies, position = chunk_names[keep], chunk_energies[keep], position[keep]
+        names.append(chunk_names.astype(object))
+        energies.append(chunk_energies)
+        rows.append(position)
+
+    table = np.empty((sum(len(n) for n in names), 2), dtype=object)
+    if len(table):
+        table[:, 0] = np.concatenate(names)
+        table[:, 1] = np.concatenate(energies)
+    return table, np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+
+def save_table(path: str, table: ndarray) -> None:
+    """Write a table of compositions and total energies as .npz, which read_table loads without parsing text."""
+    np.savez(path, compositions=np.asarray(table[:, 0], dtype=str), energies=np.asarray(table[:, 1], dtype=float))
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a table of compositions and total energies to .npz, "
+                                                 "optionally keeping only the compositions of a phase field.")
+    parser.add_argument("table", help="Input table (.csv, .parquet, .arrow, .feather, .npz, .npy)")
+    parser.add_argument("output", help="Output .npz file")
+    parser.add_argument("--elements", nargs="+", default=None, help="Elements of the phase field, e.g. Li Sn S Cl")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Rows per chunk (default: {CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    table, rows = read_table(args.table, args.elements, args.chunk_size)
+    save_table(args.output, table)
+    print(f"{len(table)} rows written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import time
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from phasebo.coordinates import parse_formulas
+
+# Suggestion status: suggested by a 'suggest' run, submitted for evaluation in 'campaign' mode,
+# computed (with its energy) or failed
+STATUSES = ('suggested', 'submitted', 'computed', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    field TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS observations (
+    field TEXT NOT NULL,
+    formula TEXT NOT NULL,
+    composition TEXT NOT NULL,
+    energy REAL NOT NULL,
+    e_above_hull REAL,
+    run INTEGER REFERENCES runs(id),
+    UNIQUE (field, formula, energy)
+);
+CREATE TABLE IF NOT EXISTS suggestions (
+    id INTEGER PRIMARY KEY,
+    field TEXT NOT NULL,
+    formula TEXT NOT NULL,
+    composition TEXT NOT NULL,
+    run INTEGER REFERENCES runs(id),
+    batch INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    energy REAL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posteriors (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    field TEXT NOT NULL,
+    point TEXT NOT NULL,
+    mean REAL NOT NULL,
+    std REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    parent TEXT,
+    depth INTEGER,
+    wall_s REAL,
+    cpu_s REAL,
+    peak_rss_mb REAL,
+    counts TEXT
+);
+CREATE INDEX IF NOT EXISTS observations_composition ON observations (field, composition);
+CREATE INDEX IF NOT EXISTS suggestions_status ON suggestions (field, status);
+CREATE INDEX IF NOT EXISTS suggestions_composition ON suggestions (field, composition);
+CREATE INDEX IF NOT EXISTS posteriors_run ON posteriors (field, run);
+"""
+
+def composition_keys(formulas: Sequence[str]) -> List[str]:
+    """
+    Atomic fractions of the formulas as text, e.g. 'Li0.666667 S0.333333' for Li2S1 and Li4 S2 alike,
+    so that a suggestion is matched by the observation of any cell of its composition.
+    """
+    if not len(formulas):
+        return []
+    amounts, elements = parse_formulas(formulas)
+    order = np.argsort(elements)
+    fractions = np.round(amounts[:, order] / amounts.sum(axis=1, keepdims=True), 6)
+    symbols = [elements[j] for j in order]
+    return [' '.join(f'{el}{x:g}' for el, x in zip(symbols, row) if x) for row in fractions]
+
+class Ledger:
+    """
+    Embedded SQLite record of the runs on phase fields: every observation, suggestion batch and its
+    evaluation status, posterior snapshots and stage timings. Phase fields are named by their elements
+    (e.g. Li-Sn-S-Cl). Each method writes in one transaction, rows in bulk. Several processes (e.g. the
+    fields of a batch) can share one ledger file; a writer waits up to timeout seconds for the others.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        # callers serialise their use of a ledger, which may then be shared between threads (see phasebo.server)
+        self.db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> 'Ledger':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self.db.close()
+
+    def start_run(self, field: str, mode: str, config: Optional[Dict[str, Any]] = None) -> int:
+        with self.db:
+            cursor = self.db.execute("INSERT INTO runs (field, mode, started, config) VALUES (?, ?, ?, ?)",
+                                     (field, mode, time.time(), json.dumps(config or {}, default=str)))
+        return cursor.lastrowid
+
+    def finish_run(self, run: int) -> None:
+        with self.db:
+            self.db.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run))
+
+    def record_observations(self, field: str, formulas: Sequence[str], energies: Sequence[float],
+                            e_above_hull: Optional[Sequence[float]] = None, run: Optional[int] = None) -> None:
+        """Computed compositions and their total energies; ones already recorded for the field are skipped."""
+        hull = e_above_hull if e_above_hull is not None else [None] * len(formulas)
+        rows = zip([field] * len(formulas), map(str, formulas), composition_keys(formulas), map(float, energies),
+                   (None if e is None else float(e) for e in hull), [run] * len(formulas))
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            # a suggestion is computed once its composition has been observed
+            self.db.execute(
+                "UPDATE suggestions SET status = 'computed', updated = ?, energy = "
+                "(SELECT energy FROM observations o WHERE o.field = suggestions.field "
+                "AND o.composition = suggestions.composition ORDER BY o.rowid DESC LIMIT 1) "
+                "WHERE field = ? AND status IN ('suggested', 'submitted') "
+                "AND composition IN (SELECT composition FROM observations WHERE field = ?)", (time.time(), field, field))
+
+    def record_suggestions(self, field: str, formulas: Sequence[str], run: Optional[int] = None,
+                           status: str = 'suggested') -> int:
+        """One batch of suggested (or submitted) formulas; returns its batch number for the field."""
+        if status not in STATUSES:
+            raise ValueError(f'Unsupported status: "{status}". Supported: {", ".join(STATUSES)}')
+        with self.db:
+            batch = self.db.execute("SELECT COALESCE(MAX(batch), 0) + 1 FROM suggestions WHERE field = ?",
+                                    (field,)).fetchone()[0]
+            now = time.time()
+            self.db.executemany(
+                "INSERT INTO suggestions (field, formula, composition, run, batch, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(field, str(f), key, run, batch, status, now) for f, key in zip(formulas, composition_keys(formulas))])
+        return batch
+
+    def set_status(self, field: str, formulas: Sequence[str], status: str,
+                   energies: Optional[Sequence[float]] = None) -> None:
+        """
+        Move the open (suggested or submitted) suggestions of the formulas' compositions to status,
+        with their energies.
+        """
+        if status not in STATUSES:
+            raise ValueError(f'Unsupported status: "{status}". Supported: {", ".join(STATUSES)}')
+        values = energies if energies is not None else [None] * len(formulas)
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "UPDATE suggestions SET status = ?, energy = ?, updated = ? "
+                "WHERE field = ? AND composition = ? AND status IN ('suggested', 'submitted')",
+                [(status, None if e is None else float(e), now, field, key)
+                 for key, e in zip(composition_keys(formulas), values)])
+
+    def record_posterior(self, field: str, run: int, points: Sequence[str], mean: np.ndarray, std: np.ndarray) -> None:
+        """One chunk of a posterior snapshot: points are formulas or comma-separated coordinates."""
+        with self.db:
+            self.db.executemany("INSERT INTO posteriors VALUES (?, ?, ?, ?, ?)",
+                                zip([run] * len(points), [field] * len(points), map(str, points),
+                                    map(float, mean), map(float, std)))
+
+    def record_stages(self, run: int, spans: Iterable[Dict[str, Any]]) -> None:
+        """Stage timings as exported by phasebo.trace."""
+        with self.db:
+            self.db.executemany("INSERT INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(run, s['name'], s['parent'], s['depth'], s['wall_s'], s['cpu_s'],
+                                  s['peak_rss_mb'], json.dumps(s['counts'], default=float)) for s in spans])
+
+    def pending(self, field: str) -> List[str]:
+        """Formulas suggested or submitted for the field and not computed (or failed) since."""
+        rows = self.db.execute("SELECT DISTINCT formula FROM suggestions WHERE field = ? "
+                               "AND status IN ('suggested', 'submitted') ORDER BY id", (field,))
+        return [r[0] for r in rows]
+
+    def latest_posterior(self, field: str) -> List[Tuple[str, float, float]]:
+        """(point, mean, std) of the most recent posterior snapshot of the field."""
+        rows = self.db.execute("SELECT point, mean, std FROM posteriors WHERE field = ? AND run = "
+                               "(SELECT MAX(run) FROM posteriors WHERE field = ?) ORDER BY rowid", (field, field))
+        return rows.fetchall()
@@ -1,10 +1,9 @@
-import os, sys
-import pandas as pd
-import numpy as np	
+import os
+import numpy as np
 from itertools import product as P
 from pprint import pprint
-#from iteration_utilities import deepflatten
-from pymatgen.entries.computed_entries import ComputedEntry
+
+from phasebo import trace
 
 def initial(compositions_list):
     c_list = open(compositions_list).readlines()
@@ -28,23 +27,124 @@ def balance(amounts, ions):
             balanced.append(a)
     return balanced
 
-def generate(ions, inlist, exclude, Ntot, limits):
-    if not exclude: exclude = []
-    amounts = span(ions, Ntot, limits)
-    amounts = balance(amounts, list(ions.values()))
-    symbols = list(ions.keys())
-    names = []
-    for amount in amounts: 
-        name = []
-        for s, n in zip(symbols, amount):
-            name.append(f'{s}{n}')
+def _element_ranges(ions, Ntot, limits=None):
+    """Inclusive (low, high) amount range for each ion, in ``ions`` order."""
+    if limits:
+        return [(int(limits[i][0]), int(limits[i][1]) - 1) for i in ions]
+    return [(0, Ntot) for i in ions]
+
+def enumerate_amounts(ions, Ntot, limits=None):
+    """
+    Lazily yield charge-balanced amount tuples with at most Ntot atoms.
+
+    Equivalent to ``balance(span(ions, Ntot, limits), ions.values())`` and
+    yielded in the same order, but branches that cannot be charge balanced
+    by the remaining elements are pruned and the last amount is solved for
+    directly, so the Cartesian product is never materialised.
+    """
+    charges = [int(c) for c in ions.values()]
+    ranges = _element_ranges(ions, Ntot, limits)
+    k = len(charges)
+    if k == 0:
+        return
+
+    def charge_bounds(j, budget):
+        """Lowest and highest charge elements j.. can add with budget atoms."""
+        lo = hi = 0
+        for c, (a, b) in zip(charges[j:], ranges[j:]):
+            b = min(b, budget)
+            lo += min(c * a, c * b)
+            hi += max(c * a, c * b)
+        return lo, hi
+
+    min_atoms = [sum(max(a, 0) for a, _ in ranges[j:]) for j in range(k + 1)]
+    amounts = [0] * k
+
+    def last(charge, budget):
+        c, (a, b) = charges[-1], ranges[-1]
+        b = min(b, budget)
+        if c == 0:
+            if charge == 0:
+                for n in range(a, b + 1):
+                    amounts[-1] = n
+                    yield tuple(amounts)
+        elif -charge % c == 0 and a <= -charge // c <= b:
+            amounts[-1] = -charge // c
+            yield tuple(amounts)
 
-        if ''.join(name) not in inlist + exclude:
-            names.append(''.join(name))
+    def descend(j, charge, budget):
+        if j == k - 1:
+            yield from last(charge, budget)
+            return
+        c, (a, b) = charges[j], ranges[j]
+        for n in range(a, min(b, budget - min_atoms[j + 1]) + 1):
+            rest = charge + c * n
+            lo, hi = charge_bounds(j + 1, budget - n)
+            if lo <= -rest <= hi:
+                amounts[j] = n
+                yield from descend(j + 1, rest, budget - n)
 
-   
+    for amount in descend(0, 0, Ntot):
+        if any(amount):
+            yield amount
+
+def amount_blocks(ions, Ntot, limits=None, chunk_size=65536):
+    """
+    Yield charge-balanced compositions as integer arrays of shape
+    (<= chunk_size, len(ions)), one column per ion.
+    """
+    block = []
+    for amount in enumerate_amounts(ions, Ntot, limits):
+        block.append(amount)
+        if len(block) == chunk_size:
+            yield np.array(block, dtype=int)
+            block = []
+    if block:
+        yield np.array(block, dtype=int)
+
+def formula_name(symbols, amount):
+    """Formula string in the generator's format, e.g. Li2Sn0S1Cl0."""
+    return ''.join(f'{s}{n}' for s, n in zip(symbols, amount))
+
+def iter_formulas(ions, inlist, exclude, Ntot, limits):
+    """
+    Lazily yield names of charge-balanced compositions not found in
+    ``inlist`` or ``exclude``.
+    """
+    skip = set(inlist if inlist is not None else []) | set(exclude if exclude else [])
+    symbols = list(ions.keys())
+    for amount in enumerate_amounts(ions, Ntot, limits):
+        name = formula_name(symbols, amount)
+        if name not in skip:
+            yield name
+
+def generate(ions, inlist, exclude, Ntot, limits):
+    with trace.span('generate', elements=len(ions), Ntot=Ntot) as s:
+        names = list(iter_formulas(ions, inlist, exclude, Ntot, limits))
+        s.count(candidates=len(names))
     return names
 
+def candidate_formulas(ions, known, exclude, Ntot, limits):
+    """
+    Charge-balanced compositions with up to Ntot atoms not among the known formulas (e.g. 'Li2 S1', in any
+    cell) or ``exclude``, one formula (the smallest cell) per reduced composition. Known formulas with
+    elements outside the phase field are ignored.
+    """
+    from phasebo.coordinates import amount_matrix, distinct_compositions
+    from phasebo.ingest import field_rows
+
+    elements = list(ions)
+    known = np.char.strip(np.asarray(list(known) + list(exclude or []), dtype=str))
+    if len(known):
+        known = known[field_rows(known, elements)]
+    names = generate(ions, [], None, Ntot, limits)
+    return [names[i] for i in distinct_compositions(amount_matrix(names, elements), amount_matrix(known, elements))]
+
+def write_candidates(names, path='candidates_list.csv'):
+    """Append candidate formulas to path, one per line."""
+    with open(path, 'a') as cl:
+        cl.write(''.join(f'{name}\n' for name in names))
+
 def print_pes(compositions, energies, log):
     if os.path.exists(log):
         if log[-1].isdigit(): 
@@ -52,21 +152,20 @@ def print_pes(compositions, energies, log):
             log = log[:-1] + str(i)
         else: log += '0'
 
-    for c,e in zip(compositions, energies):
-        print(c, e, file=open(log, 'a'))
+    with open(log, 'a') as f:
+        f.write(''.join(f'{c} {e}\n' for c, e in zip(compositions, energies)))
 
     return log 
 
 def print_next(x_next, candidates, log):
     x_next = [' '.join(map(str,x)) for x in list(x_next)]
-    for x in set(x_next):
-        next_formula = candidates[x]
-        print('next:', next_formula, file=open(log, 'a'))
+    with open(log, 'a') as f:
+        f.write(''.join(f'next: {candidates[x]}\n' for x in set(x_next)))
 
 if __name__=="__main__":
     ions = {'Li':1, 'Zn':2, 'S':-2, 'Cl':-1}
     Ntot = 24
 
     compositions = []
-    names = generate_recursive(ions, compositions, Ntot)
+    names = generate(ions, compositions, None, Ntot, None)
     pprint(names)
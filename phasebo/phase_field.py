@@ -8,6 +8,16 @@ from typing import List, Dict, Tuple, Optional
 from pymatgen.analysis.phase_diagram import PhaseDiagram
 from pymatgen.entries.computed_entries import ComputedEntry
 from pymatgen.core.composition import Composition
+from pymatgen.core.periodic_table import Element
+
+from phasebo.cache import field_key, array_key, cache_path, save_arrays, load_arrays
+from phasebo.coordinates import CoordinateIndex, amount_matrix, coordinate_keys, parse_formulas, simplex_coordinates
+from phasebo.hull import facet_planes, hull_energies, points_in_facets, equilibrium_reaction_energies, subsystem_hull
+from phasebo.trace import span
+
+# Bits of PhaseField.flags
+REFERENCE = 1
+SEED = 2
 
 class PhaseField:
     """
@@ -15,6 +25,11 @@ class PhaseField:
     Constructs convex hull (phase diagram), extracts fractional coordinates,
     segments the field for seed selection, and provides functions for potential energy surfaces
     to be used in Bayesian optimization.
+
+    The entries are stored column-wise, one row per entry: names (compositions), total energies (enthalpies),
+    element amounts, energies per atom, simplex coordinates (pd_coords), energies above hull, stability,
+    the row of the lowest-energy entry of the same composition (best) and reference/seed flags.
+    pymatgen entries, compositions and the phase diagram are only built when they are asked for.
     """
 
     def __init__(self,
@@ -23,49 +38,154 @@ class PhaseField:
                  ions: Dict[str, float],
                  exceptions: Optional[List[str]] = None,
                  allow_negative: bool = True,
-                 logger: logging.Logger = None):
+                 logger: logging.Logger = None,
+                 cache_dir: Optional[str] = None,
+                 seed: Optional[int] = None,
+                 hull_processes: Optional[int] = 1):
         self.logger = logger or logging.getLogger(__name__)
-        self.references = list(references[:, 0])
+        self.references = [str(r).strip() for r in references[:, 0]]
         self.elements = list(ions.keys())
         self.exceptions = exceptions if exceptions else []
+        self.allow_negative = allow_negative
+        self.hull_processes = hull_processes
+        # seed selection draws from its own generator when a seed is given, else from the global one
+        self.rng = random.Random(seed) if seed is not None else random
 
         # Will be populated
-        self.compositions: List[str] = []
-        self.enthalpies: List[float] = []
-
-        # Data containers
+        self.compositions: ndarray = np.array([], dtype=str)
+        self.enthalpies: ndarray = np.array([])
+
+        # Data containers; formulas, computed_entries and pd are built on first access
+        self._formulas: Optional[List[Composition]] = None
+        self._computed_entries: Optional[List[ComputedEntry]] = None
+        self._pd: Optional[PhaseDiagram] = None
+        self.pd_elements: List[str] = []
+        self.hull_planes: ndarray = np.array([])
         self.pd_coords: ndarray = np.array([])
-        self.formulas: List[Composition] = []
-        self.computed_entries: List[ComputedEntry] = []
         self.energies: ndarray = np.array([])
-        self.dic: Dict[str, List] = {}
-        self.dicfc: Dict[str, List] = {}
-        self.sections: List[List[str]] = []
+        self.amounts: ndarray = np.array([])
+        self.energies_per_atom: ndarray = np.array([])
+        self.stable: ndarray = np.array([], dtype=bool)
+        self.best: ndarray = np.array([], dtype=np.int64)
+        self.flags: ndarray = np.array([], dtype=np.uint8)
+        self.index: CoordinateIndex = None
+        self.sections: List[ndarray] = []
         self.seeds: List[str] = []
         self.seeds_energy: List[float] = []
         self.candidates: ndarray = np.array([])
         self.candidates_fc: ndarray = np.array([])
         self.candidates_energies: ndarray = np.array([])
 
-        self.exclude_exceptions(compositions)
-        self.compute_convex(allow_negative)
-        self.pd_coords = self.get_phase_coordinates(self.pd, self.formulas)
-        self.create_dict()
-        self.create_dicfc()
-        self.get_candidates()
+        # (key, (x, y, energies)) of the last interpolated hull grid
+        self._grid: Optional[Tuple[str, Tuple[ndarray, ndarray, ndarray]]] = None
+
+        self.cache_dir = cache_dir
+        self.cache_file = None
+        if cache_dir:
+            self.cache_key = field_key(compositions, ions, self.exceptions, allow_negative)
+            self.cache_file = cache_path(cache_dir, self.cache_key)
+
+        with span('phase_field', entries=len(compositions)) as s:
+            if not (self.cache_file and self.load_cache()):
+                self.exclude_exceptions(compositions)
+                self.compute_convex(allow_negative)
+                with span('get_coordinates', entries=len(self.compositions)):
+                    self.pd_coords = self.get_coordinates(self.compositions)
+                if self.cache_file:
+                    self.save_cache()
+            self.find_best()
+            self.create_index()
+            self.get_candidates()
+            s.count(candidates=len(self.candidates))
+
+    @property
+    def computed_entries(self) -> List[ComputedEntry]:
+        if self._computed_entries is None:
+            self._computed_entries, self._formulas = self.computed_compositions(self.compositions, self.enthalpies)
+        return self._computed_entries
+
+    @computed_entries.setter
+    def computed_entries(self, entries: List[ComputedEntry]):
+        self._computed_entries = entries
+
+    @property
+    def formulas(self) -> List[Composition]:
+        if self._formulas is None:
+            self._formulas = [entry.composition for entry in self.computed_entries]
+        return self._formulas
+
+    @formulas.setter
+    def formulas(self, formulas: List[Composition]):
+        self._formulas = formulas
+
+    @property
+    def pd(self) -> PhaseDiagram:
+        """
+        Phase diagram of the field, rebuilt on demand from the stable entries only,
+        which gives the same hull at a fraction of the cost and memory.
+        """
+        if self._pd is None:
+            stable = np.flatnonzero(self.stable)
+            entries, _ = self.computed_compositions([self.compositions[i] for i in stable],
+                                                    [self.enthalpies[i] for i in stable])
+            self._pd = PhaseDiagram(entries, elements=[Element(el) for el in self.pd_elements])
+        return self._pd
+
+    @pd.setter
+    def pd(self, pd: PhaseDiagram):
+        self._pd = pd
+
+    def save_cache(self):
+        """
+        Store the parsed entries, hull and coordinates in the cache file.
+        """
+        arrays = {
+            'compositions': np.array(self.compositions, dtype=str),
+            'enthalpies': np.asarray(self.enthalpies, dtype=float),
+            'amounts': self.amounts,
+            'energies_per_atom': self.energies_per_atom,
+            'stable': self.stable,
+            'hull_planes': self.hull_planes,
+            'energies': self.energies,
+            'pd_coords': self.pd_coords,
+        }
+        try:
+            save_arrays(self.cache_file, arrays, {'key': self.cache_key, 'pd_elements': self.pd_elements})
+            self.logger.info(f"Phase field cached in {self.cache_file}")
+        except OSError as ex:
+            self.logger.info(f"Could not write cache {self.cache_file}: {ex}")
+
+    def load_cache(self) -> bool:
+        """
+        Restore the phase field state from the cache file if it matches the input; returns success.
+        """
+        cached = load_arrays(self.cache_file, self.cache_key)
+        if cached is None:
+            return False
+        arrays, meta = cached
+        self.compositions = arrays['compositions']
+        self.enthalpies = arrays['enthalpies']
+        self.pd_elements = meta['pd_elements']
+        self.amounts = arrays['amounts']
+        self.energies_per_atom = arrays['energies_per_atom']
+        self.stable = arrays['stable']
+        self.hull_planes = arrays['hull_planes']
+        self.energies = arrays['energies']
+        self.pd_coords = arrays['pd_coords']
+        self.logger.info(f"Phase field loaded from cache {self.cache_file}")
+        return True
 
     def exclude_exceptions(self, compositions: ndarray):
         """
         Filter out specified compositions (exceptions) from consideration.
         """
         self.logger.info("Excluding exceptions...")
-        for i in range(len(compositions)):
-            name = compositions[i, 0].strip()
-            if name not in self.exceptions:
-                self.compositions.append(name)
-                self.enthalpies.append(compositions[i, 1])
-            else:
-                self.logger.info(f"Excluding from consideration: {name}")
+        names = np.char.strip(np.asarray(compositions[:, 0], dtype=str))
+        excluded = np.isin(names, [str(e).strip() for e in self.exceptions])
+        for name in names[excluded]:
+            self.logger.info(f"Excluding from consideration: {name}")
+        self.compositions = names[~excluded]
+        self.enthalpies = np.asarray(compositions[~excluded, 1], dtype=float)
 
     @staticmethod
     def computed_compositions(compositions: List[str], enthalpies: List[float]) -> Tuple[List[ComputedEntry], List[Composition]]:
@@ -79,27 +199,145 @@ class PhaseField:
             formulas.append(ce.composition)
         return entries, formulas
 
+    @staticmethod
+    def lowest_entries(amounts: ndarray, enthalpies: ndarray) -> ndarray:
+        """
+        Rows of the lowest energy per atom entry of each reduced composition (the first one on ties),
+        in input order. PhaseDiagram keeps only these, so they alone give the same hull as all entries.
+        """
+        atoms = amounts.sum(axis=1)
+        _, group = np.unique(coordinate_keys(amounts / atoms[:, None]), axis=0, return_inverse=True)
+        group = group.ravel()
+        order = np.lexsort((enthalpies / atoms, group))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = group[order][1:] != group[order][:-1]
+        return np.sort(order[first])
+
     def compute_convex(self, allow_negative: bool = False):
         """
         Calculates energies above convex hull (meV/atom) for all compositions.
+        The hull is built by chemical subsystem (see subsystem_hull), with the elements ordered as in
+        PhaseDiagram, over hull_processes worker processes, without pymatgen entries.
+        All entries are evaluated against the hull facets in one vectorised pass;
+        with allow_negative, stable entries get their equilibrium reaction energies instead.
         """
         self.logger.info("Computing energies above convex hull...")
-        self.computed_entries, self.formulas = self.computed_compositions(self.compositions, self.enthalpies)
-        self.pd = PhaseDiagram(self.computed_entries)
-        energies_list = []
-
-        for entry in self.computed_entries:
-            hull_energy = 1000 * self.pd.get_e_above_hull(entry)
-            if allow_negative and hull_energy == 0:
-                try:
-                    energies_list.append(1000 * self.pd.get_equilibrium_reaction_energy(entry))
-                except Exception as ex:
-                    self.logger.info(f"Exception for {entry.composition}: {ex}")
-                    energies_list.append(hull_energy)
-            else:
-                energies_list.append(hull_energy)
+        with span('compute_convex', entries=len(self.compositions)) as s:
+            amounts, found = parse_formulas(self.compositions)
+            present = [el for j, el in enumerate(found) if amounts[:, j].any()]
+            self.pd_elements = [el.symbol for el in sorted(Element(el) for el in present)]
+            self.amounts = amounts[:, [found.index(el) for el in self.pd_elements]]
+            self.energies_per_atom = self.enthalpies / self.amounts.sum(axis=1)
+
+            lowest = self.lowest_entries(self.amounts, self.enthalpies)
+            vertices, self.hull_planes = subsystem_hull(self.amounts[lowest], self.energies_per_atom[lowest],
+                                                        self.hull_processes, elements=self.pd_elements)
+            self.stable = self.is_stable(np.arange(len(self.compositions)), lowest[vertices])
+
+            self.energies = np.zeros(len(self.compositions))
+            self.update_energies(np.arange(len(self.compositions)), simplex_coordinates(self.amounts))
+            if allow_negative:
+                self.update_reaction_energies()
+            self.pd = None
+            s.count(stable=int(self.stable.sum()), facets=len(self.hull_planes))
+
+    def is_stable(self, rows: ndarray, stable_rows: Optional[ndarray] = None) -> ndarray:
+        """
+        Flags for rows that are stable entries, i.e. equal to one of them in composition and energy
+        (as in Entry.__eq__), so that duplicates of stable entries count as stable.
+        The stable entries are the rows stable_rows, by default those of the phase diagram.
+        """
+        if stable_rows is None:
+            stable = list(self.pd.stable_entries)
+            keys = amount_matrix([e.composition.formula for e in stable], self.pd_elements)
+            energies = [e.energy for e in stable]
+        else:
+            keys, energies = self.amounts[stable_rows], self.enthalpies[stable_rows]
+        vertices: Dict[bytes, List[float]] = {}
+        for key, energy in zip(keys, energies):
+            vertices.setdefault(key.tobytes(), []).append(energy)
+        flags = np.zeros(len(rows), dtype=bool)
+        for k, i in enumerate(rows):
+            energies = vertices.get(self.amounts[i].tobytes())
+            flags[k] = energies is not None and bool(np.any(np.isclose(self.enthalpies[i], energies)))
+        return flags
+
+    def update_energies(self, rows: ndarray, coords: ndarray):
+        """
+        Energies above the current hull (meV/atom) for the given rows with simplex coordinates coords.
+        """
+        hull = hull_energies(coords, self.hull_planes)
+        self.energies[rows] = np.where(self.stable[rows], 0, 1000 * (self.energies_per_atom[rows] - hull))
 
-        self.energies = np.array(energies_list)
+    def update_reaction_energies(self):
+        """
+        Replace the zero energies of stable entries by their equilibrium reaction energies (meV/atom).
+        """
+        stable = np.flatnonzero(self.stable)
+        reaction = 1000 * equilibrium_reaction_energies(self.amounts[stable], self.energies_per_atom[stable])
+        failed = np.isnan(reaction)
+        self.energies[stable] = np.where(failed, 0, reaction)
+        for i in stable[failed]:
+            self.logger.info(f"Exception for {self.compositions[i]}: could not build the hull of competing phases")
+        for i in np.flatnonzero(~self.stable & (self.energies == 0)):
+            self.logger.info(f"Exception for {self.compositions[i]}: entry is unstable, "
+                             "the equilibrium reaction energy is available only for stable entries.")
+
+    def add_results(self, compositions: List[str], enthalpies: List[float]) -> ndarray:
+        """
+        Add newly computed compositions and their total energies without rebuilding the phase field.
+        The hull is rebuilt from its stable entries only if a new entry falls below it,
+        and then only entries under the changed facets are re-evaluated.
+        Returns the rows whose energies were (re)computed.
+        """
+        exceptions = {str(e).strip() for e in self.exceptions}
+        new = [(c.strip(), e) for c, e in zip(compositions, enthalpies) if c.strip() not in exceptions]
+        if not new:
+            return np.array([], dtype=int)
+        names, enthalpies = [list(i) for i in zip(*new)]
+
+        n_old = len(self.compositions)
+        entries, formulas = self.computed_compositions(names, enthalpies)
+        amounts = amount_matrix(names, self.pd_elements)
+        energies_per_atom = np.asarray(enthalpies, dtype=float) / amounts.sum(axis=1)
+        coords = simplex_coordinates(amounts)
+        below = energies_per_atom - hull_energies(coords, self.hull_planes) < -PhaseDiagram.numerical_tol
+
+        self.compositions = np.concatenate([self.compositions, names])
+        self.enthalpies = np.concatenate([self.enthalpies, np.asarray(enthalpies, dtype=float)])
+        if self._computed_entries is not None:
+            self._computed_entries += entries
+        if self._formulas is not None:
+            self._formulas += formulas
+        self.amounts = np.vstack([self.amounts, amounts])
+        self.energies_per_atom = np.concatenate([self.energies_per_atom, energies_per_atom])
+        self.pd_coords = np.vstack([self.pd_coords, coords])
+        self.stable = np.concatenate([self.stable, np.zeros(len(names), dtype=bool)])
+        self.energies = np.concatenate([self.energies, np.zeros(len(names))])
+        rows = np.arange(n_old, len(self.compositions))
+
+        if below.any():
+            self.logger.info(f"{below.sum()} new entries below the convex hull, updating hull...")
+            with span('update_hull', entries=len(names), below=int(below.sum())) as s:
+                new_stable = [entries[i] for i in np.flatnonzero(below)]
+                self.pd = PhaseDiagram(list(self.pd.stable_entries) + new_stable, elements=self.pd.elements)
+                self.hull_planes = facet_planes(self.pd.qhull_data, self.pd.facets)
+                new_ids = {id(e) for e in new_stable}
+                changed = [f for f in self.pd.facets if any(id(self.pd.qhull_entries[i]) in new_ids for i in f)]
+                affected = points_in_facets(self.pd_coords, self.pd.qhull_data, changed)
+                rows = np.union1d(rows, np.flatnonzero(affected | self.stable))
+                self.stable[rows] = self.is_stable(rows)
+                s.count(recomputed=len(rows))
+
+        self.update_energies(rows, self.pd_coords[rows])
+        if self.allow_negative and below.any():
+            self.update_reaction_energies()
+            rows = np.union1d(rows, np.flatnonzero(self.stable))
+
+        self.find_best()
+        self.index.update(self.pd_coords, self.energies, rows)
+        self.get_candidates()
+        return rows
 
     @staticmethod
     def get_phase_coordinates(pd: PhaseDiagram, formulas: List[Composition]) -> ndarray:
@@ -109,136 +347,253 @@ class PhaseField:
         coords = [pd.pd_coords(f) for f in formulas]
         return np.array(coords)
 
-    def get_2D_square_coordinates(self) -> ndarray:
+    def get_coordinates(self, formulas: List[str]) -> ndarray:
+        """
+        Simplex coordinates of formulas in the basis of the phase diagram,
+        computed directly from element amounts without building a hull.
+        """
+        if not len(formulas):
+            return np.empty((0, len(self.pd_elements) - 1))
+        return simplex_coordinates(amount_matrix(formulas, self.pd_elements))
+
+    def get_2D_square_coordinates(self, rows: Optional[ndarray] = None) -> ndarray:
         """
         Compute fractional 2D coordinates for quaternary phase fields.
         """
-        var1, var2 = [], []
-        for formula in self.formulas:
-            c1, c2 = formula[self.elements[0]], formula[self.elements[1]]
-            a1, a2 = formula[self.elements[2]], formula[self.elements[3]]
-            var1.append(c1 / (c1 + c2) if c1 + c2 else 1)
-            var2.append(a1 / (a1 + a2) if a1 + a2 else 1)
+        amounts = self.amounts if rows is None else self.amounts[rows]
+        columns = [self.pd_elements.index(el) if el in self.pd_elements else None for el in self.elements[:4]]
+        c1, c2, a1, a2 = [amounts[:, j] if j is not None else np.zeros(len(amounts)) for j in columns]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var1 = np.where(c1 + c2 > 0, c1 / (c1 + c2), 1)
+            var2 = np.where(a1 + a2 > 0, a1 / (a1 + a2), 1)
         return np.vstack([var1, var2]).T
 
-    def create_dict(self):
+    def find_best(self):
+        """
+        For every row, the row of the lowest-energy entry of the same composition (the first one on ties),
+        which stands for all of them as candidate and seed.
         """
-        Create dictionary with unique compositions as keys and [energy, fractional coordinates, 2D square coords] as values.
+        _, group = np.unique(self.compositions, return_inverse=True)
+        group = group.ravel()
+        order = np.lexsort((self.energies, group))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = group[order[1:]] != group[order[:-1]]
+        self.best = order[first][group]
+
+    @property
+    def dic(self) -> Dict[str, List]:
         """
+        Compositions with [energy, fractional coordinates, 2D square coordinates] of their lowest-energy entry,
+        derived from the arrays on access.
+        """
+        rows = np.unique(self.best)
         if len(self.elements) == 4:
-            square_coords = self.get_2D_square_coordinates()
+            square_coords = self.get_2D_square_coordinates(rows)
         else:
-            square_coords = np.zeros((len(self.compositions), 2))
+            square_coords = np.zeros((len(rows), 2))
+        return {self.compositions[i]: [self.energies[i], self.pd_coords[i], sc] for i, sc in zip(rows, square_coords)}
 
-        for c, e, fc, sc in zip(self.compositions, self.energies, self.pd_coords, square_coords):
-            if c not in self.dic or e < self.dic[c][0]:
-                self.dic[c] = [e, fc, sc]
+    def find(self, names: List[str]) -> ndarray:
+        """
+        Rows of the lowest-energy entries of the given compositions, -1 for compositions not in the field.
+        """
+        names = np.asarray(names, dtype=str)
+        if not len(self.compositions) or not len(names):
+            return np.full(len(names), -1, dtype=np.int64)
+        order = np.argsort(self.compositions, kind='stable')
+        ordered = self.compositions[order]
+        pos = np.minimum(np.searchsorted(ordered, names), len(order) - 1)
+        return np.where(ordered[pos] == names, self.best[order[pos]], -1)
+
+    def seed_coordinates(self) -> Tuple[ndarray, ndarray]:
+        """
+        Fractional coordinates and energies of the seeds.
+        """
+        rows = self.find(self.seeds)
+        return self.pd_coords[rows].reshape(len(rows), -1), self.energies[rows]
 
-    @staticmethod
-    def fcsym(fc: ndarray) -> str:
+    def create_index(self):
         """
-        Returns string representation for fractional coordinates.
+        Index compositions by their fractional coordinates for O(1) lookups.
         """
-        return " ".join(map(str, fc.tolist()))
+        self.index = CoordinateIndex(self.pd_coords, self.energies)
 
-    def create_dicfc(self):
+    def lookup(self, x: ndarray) -> Tuple[float, str]:
         """
-        Create dictionary using fractional coordinate strings as keys and [energy, composition] as values.
+        Energy and composition at fractional coordinate x.
         """
-        for fc, e, c in zip(self.pd_coords, self.energies, self.compositions):
-            self.dicfc[self.fcsym(fc)] = [e, c]
+        i = self.index.lookup(x)
+        if i < 0:
+            raise KeyError(f"No composition at coordinates {x}")
+        return self.energies[i], self.compositions[i]
 
     def get_candidates(self):
         """
         Segregate candidates by excluding references and seeds.
+        Every candidate row carries the energy and coordinates of the lowest-energy entry of its composition.
         """
-        self.candidates = np.array([c for c in self.compositions if c not in self.references + self.seeds])
-        self.candidates_fc = np.array([self.dic[c][1] for c in self.candidates])
-        self.candidates_energies = np.array([self.dic[c][0] for c in self.candidates])
-
-    def segment_pf(self, disect: int = 4):
+        self.flags = np.zeros(len(self.compositions), dtype=np.uint8)
+        self.flags[np.isin(self.compositions, self.references)] |= REFERENCE
+        self.flags[np.isin(self.compositions, self.seeds)] |= SEED
+        rows = np.flatnonzero(self.flags == 0)
+        self.candidates = self.compositions[rows]
+        self.candidates_fc = self.pd_coords[self.best[rows]]
+        self.candidates_energies = self.energies[self.best[rows]]
+
+    def segment_pf(self, disect: int = 4) -> ndarray:
         """
-        Segment the 2D phase field into disect x disect sections.
+        Stratify the candidates for any number of elements: the atomic fraction of every element,
+        over the range the candidates span, is split into disect intervals, and the candidates are grouped
+        by the cell of this grid they fall in. Returns the cell number of every candidate;
+        sections holds the candidate indices of each occupied cell, in cell order.
         """
-        self.sections = [[[] for _ in range(disect)] for _ in range(disect)]
-        rangex = np.linspace(0, 1, disect + 1)
-        secx = list(zip(rangex[:-1], rangex[1:]))
-
-        for i, fc in enumerate(self.candidates_fc):
-            for x in range(disect):
-                if secx[x][0] <= fc[0] < secx[x][1]:
-                    for y in range(disect):
-                        if secx[y][0] <= fc[1] < secx[y][1]:
-                            self.sections[x][y].append(self.candidates[i])
-
-        # Flatten sections for easier access later
-        self.sections = [sec for row in self.sections for sec in row]
-
-    def get_seeds_from_segments(self, disect: int = 4, exclude: bool = False) -> Tuple[ndarray, ndarray]:
+        if not len(self.candidates_fc):
+            self.sections = []
+            return np.array([], dtype=np.int64)
+        fractions = np.hstack([1 - self.candidates_fc.sum(axis=1)[:, None], self.candidates_fc])
+        low, high = fractions.min(axis=0), fractions.max(axis=0)
+        scaled = (fractions - low) / np.where(high > low, high - low, 1)
+        bins = np.minimum((scaled * disect).astype(np.int64), disect - 1)
+        _, cells = np.unique(bins, axis=0, return_inverse=True)
+        cells = cells.ravel()
+        order = np.argsort(cells, kind='stable')
+        self.sections = np.split(order, np.flatnonzero(np.diff(cells[order])) + 1)
+        return cells
+
+    def get_seeds_from_segments(self, disect: int = 4, exclude: bool = False,
+                                n: Optional[int] = None) -> Tuple[ndarray, ndarray]:
         """
-        Get one random seed from each segment.
+        Get one random seed from each occupied segment, or from n random segments if there are more.
         Optionally exclude seeds with zero energies.
         """
-        self.segment_pf(disect)
-
-        for sec in self.sections:
-            random.shuffle(sec)
-            if not sec:
-                continue
-            if exclude:
-                sec = [s for s in sec if self.dic[s][0] != 0]
-                if not sec:
-                    continue
-            self.seeds.append(sec[0])
+        with span('segment_pf', candidates=len(self.candidates)) as s:
+            cells = self.segment_pf(disect)
+            s.count(sections=len(self.sections))
 
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        rows = np.arange(len(cells))
+        if exclude:
+            rows = rows[self.candidates_energies != 0]
+        # a random candidate of every cell: the first one in a random order within cells
+        order = rows[np.lexsort((rng.random(len(rows)), cells[rows]))]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = cells[order][1:] != cells[order][:-1]
+        picks = order[first]
+        if n is not None and len(picks) > n:
+            picks = picks[np.sort(rng.choice(len(picks), n, replace=False))]
+
+        self.seeds += [str(c) for c in self.candidates[picks]]
         self.get_candidates()
-        return np.array([self.dic[s][1] for s in self.seeds]), np.array([self.dic[s][0] for s in self.seeds])
+        return self.seed_coordinates()
 
     def get_random_seeds(self, n: int, exclude: bool = False) -> Tuple[ndarray, ndarray]:
         """
         Select n random seeds from candidates.
         """
-        seeds = self.candidates.tolist()
-        random.shuffle(seeds)
+        order = list(range(len(self.candidates)))
+        self.rng.shuffle(order)
         if exclude:
-            seeds = [s for s in seeds if self.dic[s][0] != 0]
-        self.seeds = seeds[:n]
+            order = [i for i in order if self.candidates_energies[i] != 0]
+        self.seeds = [str(self.candidates[i]) for i in order[:n]]
         self.get_candidates()
-        return np.array([self.dic[s][1] for s in self.seeds]), np.array([self.dic[s][0] for s in self.seeds])
+        return self.seed_coordinates()
 
-    def plot_convex(self):
+    def projection_2d(self) -> Tuple[ndarray, float]:
         """
-        Plot interpolated energy above convex hull on the 2D square field.
+        2D coordinates of all entries for plotting and the height of the plotted field (its width is 1):
+        the square field of quaternary phase fields, the composition triangle of ternary ones.
         """
-        import matplotlib.pyplot as plt
-        from matplotlib import cm
-        from scipy import interpolate
+        if len(self.elements) == 4:
+            return self.get_2D_square_coordinates(), 1.0
+        if len(self.pd_elements) == 3:
+            f1, f2 = self.pd_coords[:, 0], self.pd_coords[:, 1]
+            return np.vstack([f1 + f2 / 2, f2 * np.sqrt(3) / 2]).T, np.sqrt(3) / 2
+        raise ValueError(f"No 2D projection of a {len(self.elements)}-element phase field")
 
-        gridsize = 0.005
-        xnew = np.arange(0, 1, gridsize)
-        ynew = np.arange(0, 1, gridsize)
+    def convex_grid(self, gridsize: float = 0.005) -> Tuple[ndarray, ndarray, ndarray]:
+        """
+        Energies above hull interpolated on a regular grid over the 2D projection of the field:
+        grid lines x and y and energies of shape (len(y), len(x)), NaN outside the computed compositions.
+        The grid is kept for the current energies and stored in the cache directory if there is one.
+        """
+        data, height = self.projection_2d()
+        key = array_key(data, self.energies, gridsize=gridsize)
+        if self._grid is not None and self._grid[0] == key:
+            return self._grid[1]
+
+        path = cache_path(self.cache_dir, key, 'grid') if self.cache_dir else None
+        cached = load_arrays(path, key) if path else None
+        if cached is not None:
+            grid = cached[0]['x'], cached[0]['y'], cached[0]['energies']
+        else:
+            from scipy import interpolate
+            x = np.arange(0, 1, gridsize)
+            y = np.arange(0, height, gridsize)
+            f_interp = interpolate.LinearNDInterpolator(data, self.energies)
+            grid = x, y, f_interp(*np.meshgrid(x, y))
+            if path:
+                try:
+                    save_arrays(path, dict(zip(('x', 'y', 'energies'), grid)), {'key': key})
+                except OSError as ex:
+                    self.logger.info(f"Could not write cache {path}: {ex}")
+        self._grid = key, grid
+        return grid
+
+    def draw_convex(self, fig):
+        """
+        Draw the interpolated energy above convex hull on the 2D projection of the field into a matplotlib figure.
+        """
+        from matplotlib import cm
 
-        data = self.get_2D_square_coordinates()
-        f_interp = interpolate.LinearNDInterpolator(data, self.energies)
-        znew = np.array([[f_interp(x, y) for x in xnew] for y in ynew])
+        x, y, z = self.convex_grid()
+        data, height = self.projection_2d()
 
-        fig, ax = plt.subplots()
-        cs = ax.contourf(xnew, ynew, znew, 50, cmap=cm.gist_heat)
-        cbar = plt.colorbar(cs, ax=ax)
+        ax = fig.add_subplot()
+        cs = ax.contourf(x, y, z, 50, cmap=cm.gist_heat)
+        cbar = fig.colorbar(cs, ax=ax)
         cbar.set_label('Energy above hull (meV/atom)', fontsize=14)
 
         ax.scatter(data[:, 0], data[:, 1], c='lime', marker='3', lw=1.5, label='Computed compositions')
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.set_xlabel(f'{self.elements[0]}/({self.elements[0]}+{self.elements[1]})', fontsize=14)
-        ax.set_ylabel(f'{self.elements[2]}/({self.elements[2]}+{self.elements[3]})', fontsize=14)
+        if len(self.elements) == 4:
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+            ax.set_xlabel(f'{self.elements[0]}/({self.elements[0]}+{self.elements[1]})', fontsize=14)
+            ax.set_ylabel(f'{self.elements[2]}/({self.elements[2]}+{self.elements[3]})', fontsize=14)
+        else:
+            ax.plot([0, 1, 0.5, 0], [0, 0, height, 0], c='k', lw=1)
+            for (vx, vy), el, va in zip([(0, 0), (1, 0), (0.5, height)], self.pd_elements, ['top', 'top', 'bottom']):
+                ax.text(vx, vy, el, ha='center', va=va, fontsize=14)
+            ax.set_aspect('equal')
+            ax.axis('off')
         ax.legend(bbox_to_anchor=(0.5, 1.1), fontsize=10)
+        return fig
+
+    def plot_convex(self):
+        """
+        Plot interpolated energy above convex hull on the 2D projection of the field.
+        """
+        import matplotlib.pyplot as plt
 
+        self.draw_convex(plt.figure())
         return plt
 
+    def save_convex(self, path: str) -> None:
+        """
+        Write the convex hull plot without a display: an image for .png, .svg or .pdf, or, for .npz,
+        the interpolated grid (x, y, energies) together with the projected entries (points, point_energies).
+        """
+        if path.endswith('.npz'):
+            x, y, z = self.convex_grid()
+            np.savez_compressed(path, x=x, y=y, energies=z, points=self.projection_2d()[0],
+                                point_energies=self.energies)
+            return
+        from matplotlib.figure import Figure
+
+        self.draw_convex(Figure()).savefig(path, bbox_inches='tight')
+
     def f(self, x: ndarray) -> float:
         """
         Function of energy at fractional coordinate x (discrete).
         """
-        matches = np.all(self.pd_coords == x, axis=1)
-        return np.dot(np.where(matches, 1, 0), self.energies)
+        i = self.index.lookup(x)
+        return self.energies[i] if i >= 0 else 0.0
@@ -1,18 +1,25 @@
-import sys
+import copy
 import time
 import logging
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from numpy.random import seed
-from pymatgen.analysis.phase_diagram import PhaseDiagram
+from scipy.special import comb
 from GPyOpt.methods import BayesianOptimization
-import matplotlib.pyplot as plt
-from matplotlib import cm
-from typing import Optional, Tuple, List
+from GPyOpt.util.general import normalize
+from concurrent.futures import wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from typing import Optional, Tuple, List, Dict, Any
 
 from phasebo.phase_field import PhaseField
-from phasebo.list_compositions import generate
+from phasebo.coordinates import CoordinateIndex, amount_matrix, distinct_compositions, simplex_coordinates
+from phasebo.list_compositions import candidate_formulas, write_candidates
+from phasebo.campaign import Evaluator
+from phasebo.cache import field_key, array_key, cache_path, save_arrays, load_arrays
+from phasebo.checkpoint import save_checkpoint, load_checkpoint, set_rng_state
+from phasebo.surrogate import model_arguments, get_parameters, set_parameters, output_stats, output_drift, refinement
+from phasebo.acquisition import ChunkedThompsonBatch
+from phasebo.posterior import PosteriorWriter, output_scale, simplex_grid, stream_posterior
+from phasebo.ledger import Ledger
+from phasebo.trace import span, traced, enabled as tracing
 
 class PhaseFieldBO(PhaseField):
 
@@ -33,9 +40,25 @@ class PhaseFieldBO(PhaseField):
                  exceptions: Optional[List[str]] = None,
                  allow_negative: bool = False,
                  logger: logging.Logger = None,
+                 cache_dir: Optional[str] = None,
+                 seed: Optional[int] = None,
+                 checkpoint: Optional[str] = None,
+                 checkpoint_every: int = 0,
+                 resume: bool = False,
+                 surrogate: str = 'GP',
+                 num_inducing: int = 100,
+                 num_features: int = 500,
+                 acquisition: str = 'thompson',
+                 chunk_size: int = 65536,
+                 prescreen: Optional[float] = None,
+                 refit_drift: float = 0.2,
+                 ledger: Optional[Ledger] = None,
+                 run_id: Optional[int] = None,
+                 hull_processes: Optional[int] = 1,
                  ) -> None:
 
-        super().__init__(compositions, references, ions, exceptions, allow_negative, logger)
+        super().__init__(compositions, references, ions, exceptions, allow_negative, logger, cache_dir, seed,
+                         hull_processes)
         self.ions = ions
         self.mode = mode
         self.iter = max_iter
@@ -47,50 +70,84 @@ class PhaseFieldBO(PhaseField):
         self.limits = limits
         self.batch = batch
         self.next_formulas = next_formulas
-        self.exceptions = exceptions
         self.logger = logger or logging.getLogger(__name__)
+        self.surrogate = surrogate
+        self.num_inducing = num_inducing
+        self.num_features = num_features
+        self.acquisition = acquisition
+        self.chunk_size = chunk_size
+        self.prescreen = prescreen
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_key = field_key(compositions, ions, self.exceptions, allow_negative)
+        # hyperparameters of the last fit on this phase field, whatever its data, for warm starts
+        self.refit_drift = refit_drift
+        self.surrogate_file = None
+        if cache_dir:
+            self.surrogate_key = array_key(ions=self.elements, surrogate=surrogate,
+                                           num_inducing=num_inducing, num_features=num_features)
+            self.surrogate_file = cache_path(cache_dir, self.surrogate_key, 'surrogate')
+        # observations, suggestions and their status, posteriors of this run (run_id) in the ledger
+        self.field = '-'.join(self.elements)
+        self.ledger = ledger
+        self.run_id = run_id
+        if ledger is not None:
+            ledger.record_observations(self.field, self.compositions, self.enthalpies, self.energies, run_id)
 
-        self.setBO()
+        state = self.load_state() if (checkpoint and resume) else None
+        with span('setBO', mode=mode):
+            self.setBO(state)
         if self.mode == 'path':
-            self.bo.run_optimization(self.iter, verbosity=False)
+            self.run_path(state[1]['iteration'] if state else 0)
         elif self.mode == 'suggest':
-            self.next = self.bo.suggest_next_locations()
+            self.suggest(state)
 
-    def setBO(self) -> None:
+    def setBO(self, state: Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]] = None) -> None:
         if self.mode == 'path':
             self.logger.info(f"Mode: 'path' with NSEEDS: {self.n_seeds}")
-            if self.seeds_type == 'random':
+            if state:
+                arrays, _ = state
+                self.seeds = [str(s) for s in arrays['seeds']]
+                self.path_counts = [int(c) for c in arrays.get('path_counts', [])]
+                self.get_candidates()
+                self.nseeds, self.nseeds_energy = self.seed_coordinates()
+            elif self.seeds_type == 'random':
                 self.nseeds, self.nseeds_energy = self.get_random_seeds(self.n_seeds, self.exclude)
             elif self.seeds_type == 'segmented':
-                self.nseeds, self.nseeds_energy = self.get_seeds_from_segments(self.disect, self.exclude)
+                self.nseeds, self.nseeds_energy = self.get_seeds_from_segments(self.disect, self.exclude, self.n_seeds)
             else:
                 raise ValueError(f'Unsupported seeds_type: "{self.seeds_type}". Supported: "random", "segmented"')
 
+            if not state:
+                self.path_counts = []
             f = self.f
-            X_init = self.nseeds
-            Y_init = self.nseeds_energy[:, None]
+            X_init = self.nseeds if not state else state[0]['X']
+            Y_init = self.nseeds_energy[:, None] if not state else state[0]['Y']
             self.domain = [{'name': 'var_1', 'type': 'bandit', 'domain': self.candidates_fc}]
 
-        elif self.mode == 'suggest':
+        elif self.mode in ('suggest', 'campaign'):
             f = None
             X_init = self.candidates_fc
             Y_init = self.candidates_energies[:, None]
 
+            if state and not self.next_formulas:
+                self.next_formulas = [str(f) for f in state[0]['next_formulas']]
             if not self.next_formulas:
                 self.logger.info("Generating candidate compositions ...")
-                self.next_formulas = generate(self.ions, self.formulas, self.exceptions, self.Ntot, self.limits)
+                self.next_formulas = candidate_formulas(self.ions, self.compositions, self.exceptions, self.Ntot,
+                                                        self.limits)
 
-            dom, self.next_list = self.get_dom_phase()
+            # formulas computed before (or since the checkpoint) leave the domain
+            dom, self.next_index = self.get_dom_phase()
             self.domain = [{'name': 'var_1', 'type': 'bandit', 'domain': dom}]
 
         elif self.mode == 'generate':
             self.logger.info("Generating candidate compositions, writing to candidates_list.csv")
-            self.next_formulas = generate(self.ions, self.formulas, self.exceptions, self.Ntot, self.limits)
-            with open("candidates_list.csv", 'a') as cl:
-                for f in self.next_formulas:
-                    print(f, file=cl)
+            self.next_formulas = candidate_formulas(self.ions, self.compositions, self.exceptions, self.Ntot,
+                                                    self.limits)
+            write_candidates(self.next_formulas)
         else:
-            raise ValueError(f'Unsupported mode: "{self.mode}". Supported: "path", "suggest", "generate".')
+            raise ValueError(f'Unsupported mode: "{self.mode}". Supported: "path", "suggest", "campaign", "generate".')
 
         if self.mode != 'generate':
             self.bo = BayesianOptimization(f=f,
@@ -99,79 +156,377 @@ class PhaseFieldBO(PhaseField):
                                            Y=Y_init,
                                            evaluator_type='thompson_sampling',
                                            batch_size=self.batch,
-                                           de_duplication=True)
+                                           de_duplication=True,
+                                           **model_arguments(self.surrogate, self.num_inducing, self.num_features))
+            if self.acquisition == 'chunked_thompson':
+                self.bo.evaluator = ChunkedThompsonBatch(self.bo.acquisition, self.batch, self.chunk_size, self.prescreen)
+            elif self.acquisition != 'thompson':
+                raise ValueError(f'Unsupported acquisition: "{self.acquisition}". Supported: "thompson", "chunked_thompson"')
+            if state:
+                self.restore_model(state)
+            if self.mode == 'path':
+                self.count_batches()
+            if tracing():
+                self.trace_model()
+
+    def count_batches(self) -> None:
+        """
+        Record in path_counts the number of compositions each 'path' iteration adds, fewer than batch once
+        the domain runs low, so that the observations can be mapped to their iterations.
+        """
+        compute = self.bo._compute_next_evaluations
+
+        def counted(*args, **kwargs):
+            X = compute(*args, **kwargs)
+            self.path_counts.append(len(X))
+            return X
+        self.bo._compute_next_evaluations = counted
+
+    def trace_model(self) -> None:
+        """Record surrogate fits and acquisition batches of the optimiser as separate trace spans."""
+        self.bo._update_model = traced('fit_model', self.bo._update_model,
+                                       lambda: {'observations': len(self.bo.X)})
+        self.bo._compute_next_evaluations = traced('acquisition', self.bo._compute_next_evaluations,
+                                                   lambda: {'candidates': len(self.domain[0]['domain']),
+                                                            'batch': self.bo.evaluator.batch_size})
+
+    def run_path(self, done: int = 0) -> None:
+        """
+        Replay max_iter iterations of BO in 'path' mode, starting after `done` already finished ones.
+        With a checkpoint file the state is written every checkpoint_every iterations (default: at the end)
+        from within the one optimisation loop, before the surrogate is refitted on the new batch, so that
+        a resumed run continues exactly as the uninterrupted one.
+        """
+        every = self.checkpoint_every or max(self.iter, 1)
+        saved = done
+        if self.checkpoint:
+            update_model = self.bo._update_model
+
+            def checkpointed(*args, **kwargs):
+                nonlocal saved
+                finished = done + self.bo.num_acquisitions
+                if finished > saved and (finished % every == 0 or finished == self.iter):
+                    self.save_state(finished)
+                    saved = finished
+                return update_model(*args, **kwargs)
+            self.bo._update_model = checkpointed
+
+        n = self.iter - done
+        with span('run_path', iterations=n, batch=self.batch) as s:
+            self.bo.run_optimization(n, verbosity=False)
+            s.count(observations=len(self.bo.X))
+        if self.checkpoint and done + self.bo.num_acquisitions > saved:
+            self.save_state(done + self.bo.num_acquisitions)
+
+    def suggest(self, state: Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]] = None) -> None:
+        """
+        Suggest the next batch in 'suggest' mode. When resuming from a checkpoint with the same observations,
+        the stored GP hyperparameters are reused as they are instead of being optimised again. Otherwise, with
+        a cache_dir, the fit starts from the hyperparameters last fitted on this phase field and only refines them.
+        """
+        unchanged = state is not None and state[0]['X'].shape == self.bo.X.shape \
+            and np.array_equal(state[0]['X'], self.bo.X) and np.array_equal(state[0]['Y'], self.bo.Y)
+        max_iters = self.bo.model.max_iters
+        if unchanged:
+            self.logger.info("Observations unchanged since the checkpoint, reusing the GP hyperparameters")
+            self.bo.model.max_iters = 0
+        warm = not unchanged and self.warm_start()
+        try:
+            with refinement(self.bo.model) if warm else nullcontext():
+                self.next = self.bo.suggest_next_locations()
+        finally:
+            self.bo.model.max_iters = max_iters
+        self.save_surrogate()
+        if self.checkpoint:
+            self.save_state()
+        if self.ledger is not None:
+            self.ledger.record_suggestions(self.field, [self.next_formulas[self.next_index.lookup(x)] for x in self.next],
+                                           self.run_id)
+
+    def warm_start(self) -> bool:
+        """
+        Set the surrogate to the hyperparameters stored for this phase field, unless the observations drifted
+        further than refit_drift since they were fitted (see output_drift). Returns whether it did.
+        """
+        stored = load_arrays(self.surrogate_file, self.surrogate_key) if self.surrogate_file else None
+        if stored is None:
+            return False
+        arrays, _ = stored
+        drift = output_drift(arrays['stats'], output_stats(self.bo.Y))
+        if drift > self.refit_drift:
+            self.logger.info(f"Observations drifted by {drift:.2f} since the stored fit, optimising the hyperparameters")
+            return False
+        if not set_parameters(self.bo.model, self.bo.space.unzip_inputs(self.bo.X),
+                              normalize(self.bo.Y, self.bo.normalization_type), arrays['params']):
+            return False
+        self.logger.info(f"Warm start from the stored hyperparameters (drift {drift:.2f}), refining them")
+        return True
+
+    def save_surrogate(self) -> None:
+        """Store the fitted hyperparameters and the statistics of the observations they were fitted on."""
+        if not self.surrogate_file:
+            return
+        arrays = {'params': get_parameters(self.bo.model), 'stats': output_stats(self.bo.Y)}
+        try:
+            save_arrays(self.surrogate_file, arrays, {'key': self.surrogate_key, 'surrogate': self.surrogate})
+        except OSError as ex:
+            self.logger.info(f"Could not write {self.surrogate_file}: {ex}")
+
+    def save_state(self, iteration: int = 0) -> None:
+        """Write observations, seeds, domain, GP hyperparameters and RNG state to the checkpoint file."""
+        arrays = {
+            'X': np.asarray(self.bo.X, dtype=float),
+            'Y': np.asarray(self.bo.Y, dtype=float),
+            'seeds': np.array(self.seeds, dtype=str),
+            'domain': np.asarray(self.domain[0]['domain'], dtype=float),
+            'next_formulas': np.array(self.next_formulas or [], dtype=str),
+            'gp_params': get_parameters(self.bo.model),
+        }
+        if self.mode == 'path':
+            arrays['path_counts'] = np.array(self.path_counts, dtype=int)
+        meta = {'key': self.checkpoint_key, 'mode': self.mode, 'iteration': int(iteration), 'surrogate': self.surrogate}
+        try:
+            save_checkpoint(self.checkpoint, arrays, meta)
+            self.logger.info(f"Checkpoint written to {self.checkpoint} (iteration {iteration})")
+        except OSError as ex:
+            self.logger.info(f"Could not write checkpoint {self.checkpoint}: {ex}")
+
+    def load_state(self) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """
+        Read the checkpoint file for resuming. A 'path' checkpoint is only valid for the same input data;
+        a 'suggest' checkpoint is reused after new results were added to the input (only its domain and
+        GP hyperparameters are taken over). Returns None (fresh start) if the checkpoint does not apply.
+        """
+        state = load_checkpoint(self.checkpoint)
+        if state is None:
+            self.logger.info(f"No checkpoint found in {self.checkpoint}, starting from scratch")
+            return None
+        _, meta = state
+        if meta.get('mode') != self.mode or meta.get('surrogate', 'GP') != self.surrogate \
+                or (self.mode == 'path' and meta.get('key') != self.checkpoint_key):
+            self.logger.info(f"Checkpoint {self.checkpoint} does not match this run, starting from scratch")
+            return None
+        self.logger.info(f"Resuming from checkpoint {self.checkpoint} (iteration {meta['iteration']})")
+        return state
+
+    def restore_model(self, state: Tuple[Dict[str, np.ndarray], Dict[str, Any]]) -> None:
+        """Rebuild the GP with the stored hyperparameters and, in 'path' mode, restore the RNG state."""
+        arrays, meta = state
+        if len(arrays['gp_params']):
+            set_parameters(self.bo.model, self.bo.space.unzip_inputs(self.bo.X),
+                           normalize(self.bo.Y, self.bo.normalization_type), arrays['gp_params'])
+        if self.mode == 'path':
+            set_rng_state(arrays, meta)
+
+    def get_dom_phase(self) -> Tuple[np.ndarray, CoordinateIndex]:
+        """
+        Simplex coordinates of the candidate formulas, the BO domain. Candidates at the coordinates of computed
+        compositions are dropped from next_formulas, and of the multiples of one reduced composition
+        (e.g. Li2S1 and Li4S2) only the formula with the smallest cell, the first one on ties, is kept,
+        so that every domain point is a distinct composition still to be computed.
+        """
+        with span('get_dom_phase', candidates=len(self.next_formulas)) as s:
+            amounts = amount_matrix(self.next_formulas, self.pd_elements)
+            keep = distinct_compositions(amounts, self.amounts)
+            if len(keep) < len(self.next_formulas):
+                self.logger.info(f"{len(self.next_formulas)} candidate formulas, {len(keep)} distinct compositions "
+                                 f"not computed yet")
+            self.next_formulas = [self.next_formulas[i] for i in keep]
+            self.next_coords = simplex_coordinates(amounts[keep])
+            s.count(domain=len(keep))
+        return self.next_coords, CoordinateIndex(self.next_coords)
+
+    def set_domain(self, dom: np.ndarray) -> None:
+        """Replace the bandit domain of the live optimiser in place."""
+        self.domain[0]['domain'] = dom
+        for var in self.bo.space.space + self.bo.space.space_expanded:
+            var.domain = dom
+
+    def add_results(self, compositions: List[str], enthalpies: List[float], suggest: bool = True) -> np.ndarray:
+        """Ingest newly computed compositions and refresh the surrogate from the updated phase field."""
+        n_old = len(self.compositions)
+        rows = super().add_results(compositions, enthalpies)
+        if len(rows) and self.mode in ('path', 'suggest', 'campaign'):
+            self.update_model(suggest)
+        if self.ledger is not None and len(self.compositions) > n_old:
+            self.ledger.record_observations(self.field, self.compositions[n_old:], self.enthalpies[n_old:],
+                                            self.energies[n_old:], self.run_id)
+        return rows
+
+    def update_model(self, suggest: bool = True) -> None:
+        """
+        Bring the optimiser in line with the phase field: in 'suggest' and 'campaign' modes the observations are
+        reset to the known candidates, computed formulas leave the domain and (optionally) new locations are suggested.
+        """
+        if self.mode == 'path':
+            self.set_domain(self.candidates_fc)
+        elif self.mode in ('suggest', 'campaign'):
+            dom, self.next_index = self.get_dom_phase()
+            self.bo.X = self.candidates_fc
+            self.bo.Y = self.candidates_energies[:, None]
+            self.set_domain(dom)
+            if suggest:
+                self.next = self.bo.suggest_next_locations()
+
+    def suggest_pending(self, n: int, pending: np.ndarray, ignored: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Suggest n new locations while the points in pending are still being evaluated.
+        Pending points are never suggested again and enter the surrogate as fantasies at their
+        posterior mean (kriging believer), which moves the next suggestions away from them.
+        The hyperparameters are fitted once, on the computed compositions; the fantasies only condition the model.
+        """
+        bo = self.bo
+        X, Y = self.candidates_fc, self.candidates_energies[:, None]
+        # a batch of n from a copy: the optimiser's own evaluator keeps its batch size
+        evaluator = copy.copy(bo.evaluator)
+        evaluator.batch_size = n
+        if hasattr(evaluator, 'num_anchor'):
+            evaluator.num_anchor = max(evaluator.num_anchor, 5 * n)
+        batch_evaluator, max_iters = bo.evaluator, bo.model.max_iters
+        bo.X, bo.Y, bo.context = X, Y, None
+        try:
+            bo._update_model(bo.normalization_type)
+            if len(pending):
+                mean, _ = bo.model.predict(pending)
+                shift, scale = output_scale(Y, bo.normalization_type) if bo.normalize_Y else (0.0, 1.0)
+                bo.X, bo.Y = np.vstack([X, pending]), np.vstack([Y, shift + scale * mean])
+                bo.model.max_iters = 0
+                bo._update_model(bo.normalization_type)
+            bo.evaluator = evaluator
+            return bo._compute_next_evaluations(pending_zipped_X=pending if len(pending) else None,
+                                                ignored_zipped_X=ignored if ignored is not None and len(ignored) else None)
+        finally:
+            bo.evaluator, bo.model.max_iters = batch_evaluator, max_iters
+            bo.X, bo.Y = X, Y
 
-    def get_dom_phase(self) -> Tuple[np.ndarray, dict]:
-        """Add generated formulas to phase field to compute coordinates."""
-        next_entries, next_formulas = self.computed_compositions(self.next_formulas, 100 * np.ones(len(self.next_formulas)))
-        tmp_pd = PhaseDiagram(self.computed_entries + next_entries)
-        self.next_coords = self.get_phase_coordinates(tmp_pd, next_formulas)
-        next_dic = {self.fcsym(f): name for f, name in zip(self.next_coords, self.next_formulas)}
-        return self.next_coords, next_dic
+    def run_campaign(self, evaluator: Evaluator, n_parallel: Optional[int] = None,
+                     max_evaluations: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Closed-loop campaign: keep n_parallel evaluations in flight, ingest every result as soon as it
+        returns and replace it with a new suggestion that accounts for the points still pending.
+        Stops after max_evaluations submissions (default: max_iter) or when the domain is exhausted.
+        Returns the (formula, total energy) pairs in the order they completed; formulas whose evaluation
+        failed are kept in campaign_failed.
+        """
+        n_parallel = n_parallel or self.batch
+        max_evaluations = self.iter if max_evaluations is None else max_evaluations
+        inflight = {}
+        failed = []
+        submitted = 0
+        self.campaign_results = []
+        self.campaign_failed = []
+
+        def pending_coords() -> np.ndarray:
+            return np.array([x for _, x in inflight.values()]).reshape(-1, self.next_coords.shape[1])
+
+        def submit(n: int) -> None:
+            nonlocal submitted
+            n = min(n, max_evaluations - submitted, len(self.next_formulas) - len(inflight) - len(failed))
+            if n <= 0:
+                return
+            ignored = np.array(failed).reshape(-1, self.next_coords.shape[1])
+            formulas = []
+            for x in self.suggest_pending(n, pending_coords(), ignored):
+                row = self.next_index.lookup(x)
+                formula = self.next_formulas[row]
+                self.logger.info(f"Submitted: {formula}")
+                inflight[evaluator.submit(formula)] = (formula, self.next_coords[row])
+                formulas.append(formula)
+                submitted += 1
+            if self.ledger is not None:
+                self.ledger.record_suggestions(self.field, formulas, self.run_id, status='submitted')
+
+        self.logger.info(f"Mode: 'campaign' with {n_parallel} evaluations in flight, {max_evaluations} in total")
+        submit(n_parallel)
+        while inflight:
+            done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+            for future in done:
+                formula, x = inflight.pop(future)
+                try:
+                    energy = float(future.result())
+                except Exception as err:
+                    self.logger.warning(f"Evaluation of {formula} failed: {err}")
+                    self.campaign_failed.append(formula)
+                    failed.append(x)
+                    if self.ledger is not None:
+                        self.ledger.set_status(self.field, [formula], 'failed')
+                    continue
+                self.logger.info(f"Computed: {formula} {energy}")
+                self.campaign_results.append((formula, energy))
+                if not len(self.add_results([formula], [energy], suggest=False)):
+                    # excluded formulas stay in the domain, never suggest them again
+                    failed.append(x)
+                    if self.ledger is not None:
+                        self.ledger.set_status(self.field, [formula], 'failed', [energy])
+            submit(len(done))
+        return self.campaign_results
 
     def print_results(self) -> None:
+        """Log the compositions by energy above the hull (one record), and in 'path' mode write the path file at once."""
         self.logger.info("Writing results to log file...")
         arg = np.argsort(self.candidates_energies)
-        self.logger.info('All compositions:')
-        self.logger.info('-----------------')
-        self.logger.info('Composition     meV/atom above CH')
-        for c, e in zip(np.array(self.candidates)[arg], np.array(self.candidates_energies)[arg]):
-            self.logger.info(c, round(e, 2))
+        lines = ['All compositions:', '-----------------', 'Composition     meV/atom above CH']
+        lines += [f"{c} {round(e, 2)}" for c, e in zip(np.array(self.candidates)[arg],
+                                                        np.array(self.candidates_energies)[arg])]
+        self.logger.info('\n'.join(lines))
 
         if self.mode == 'path':
-            observed = self.bo.X
-            en_observed = np.array([self.dicfc[self.fcsym(x)][0] for x in observed])
-            names = [self.dicfc[self.fcsym(x)][1] for x in observed]
-
-            pf = '-'.join(self.elements)
-            with open(f'BO_Path_in_{pf}.txt', 'a') as f:
-                print('Seeds:', file=f)
-                print('------', file=f)
-                print('Composition     meV/atom above CH', file=f)
-                for s, e in zip(self.nseeds, self.nseeds_energy):
-                    print(self.dicfc[self.fcsym(s)][1], round(e, 2), file=f)
-                print('\nBO Path:', file=f)
-                print('--------', file=f)
-                print('Composition     meV/atom above CH', file=f)
-                for n, e in zip(names, en_observed):
-                    print(n, round(e, 2), file=f)
+            observed = self.index.lookup_many(self.bo.X)
+            en_observed = self.energies[observed]
+            names = np.array(self.compositions)[observed]
+
+            lines = ['Seeds:', '------', 'Composition     meV/atom above CH']
+            lines += [f"{self.lookup(s)[1]} {round(e, 2)}" for s, e in zip(self.nseeds, self.nseeds_energy)]
+            lines += ['\nBO Path:', '--------', 'Composition     meV/atom above CH']
+            lines += [f"{n} {round(e, 2)}" for n, e in zip(names, en_observed)]
+            with open(f'BO_Path_in_{self.field}.txt', 'a') as f:
+                f.write('\n'.join(lines) + '\n')
 
         elif self.mode == 'suggest':
-            for n in self.next:
-                self.logger.info(f"Next: {self.next_list[self.fcsym(n)]}")
+            self.logger.info('\n'.join(f"Next: {self.next_formulas[self.next_index.lookup(n)]}" for n in self.next))
 
-    def get_uncertainty(self, mesh=False) -> None:
-        """Log variances of surrogate predictions."""
-        model = self.bo.model
+    def posterior(self, formulas: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Posterior mean and uncertainty (standard deviation) of the surrogate in meV/atom at the compositions
+        of formulas, predicted chunk_size at a time. Formulas with elements outside the phase field raise ValueError.
+        """
+        coords = simplex_coordinates(amount_matrix(formulas, self.pd_elements))
+        shift, scale = output_scale(self.bo.Y, self.bo.normalization_type) if self.bo.normalize_Y else (0.0, 1.0)
+        mean, std = np.zeros(len(coords)), np.zeros(len(coords))
+        for i in range(0, len(coords), self.chunk_size):
+            m, s = self.bo.model.predict(coords[i:i + self.chunk_size])
+            mean[i:i + len(m)], std[i:i + len(s)] = shift + scale * m[:, 0], scale * s[:, 0]
+        return mean, std
 
-        if mesh:
-            bounds = self.bo.acquisition.space.get_bounds()
-            X1 = np.linspace(bounds[0][0], bounds[0][1], mesh)
-            X2 = np.linspace(bounds[1][0], bounds[1][1], mesh)
-            X3 = np.linspace(bounds[2][0], bounds[2][1], mesh)
-            x1, x2, x3 = np.meshgrid(X1, X2, X3)
-            X = np.hstack((x1.reshape(-1, 1), x2.reshape(-1, 1), x3.reshape(-1, 1)))
-            _, variance = model.predict(X)
-
-            self.logger.info(f"Min variance: {round(min(variance)[0], 1)} meV/atom at {X[np.argmin(variance)]}")
-            self.logger.info(f"Max variance: {round(max(variance)[0], 1)} meV/atom at {X[np.argmax(variance)]}")
-            self.logger.info(f"Minimum uncertainty in prediction is {round(min(variance)[0], 1)} meV/atom at {X[np.argmin(variance)]}")
-            self.logger.info(f"Maximum uncertainty in prediction is {round(max(variance)[0], 1)} meV/atom at {X[np.argmax(variance)]}")
+    def get_uncertainty(self, mesh: Optional[int] = None, path: Optional[str] = None) -> str:
+        """
+        Posterior mean and uncertainty (standard deviation) of the surrogate in meV/atom over the candidates, or,
+        with mesh, over a grid of the whole composition simplex with mesh intervals per coordinate, for any
+        number of elements. Points are predicted chunk_size at a time and written as they are computed
+        to path (.csv or .npy; default: posterior_<timestamp>.csv). Logs the lowest and highest uncertainty.
+        """
+        if path is None:
+            path = f"posterior_{time.strftime('%b-%d-%Y_%H%M', time.localtime())}.csv"
+        shift, scale = output_scale(self.bo.Y, self.bo.normalization_type) if self.bo.normalize_Y else (0.0, 1.0)
+        size = self.chunk_size
 
+        if mesh:
+            dims = len(self.pd_elements) - 1
+            points = comb(mesh + dims, dims, exact=True)
+            writer = PosteriorWriter(path, points, self.pd_elements[1:])
+            chunks = ((X, None) for X in simplex_grid(dims, mesh, size))
         else:
-            X = self.next_coords
-            scaler = StandardScaler().fit(self.candidates_energies[:, None])
-            mean, variance = model.predict(X)
-            mean = scaler.inverse_transform(mean)
-            variance = scaler.inverse_transform(variance)
-
-            un_df = pd.DataFrame({
-                'Candidates': self.next_formulas,
-                'Posterior mean (meV/atom)': [round(i, 1) for i in mean.flatten()],
-                'Variance (meV/atom)': [round(i, 1) for i in variance.flatten()]
-            })
-            un_df = un_df.sort_values(['Posterior mean (meV/atom)'])
-
-            timestamp = time.strftime('%b-%d-%Y_%H%M', time.localtime())
-            un_df.to_csv(f'posterior_{timestamp}.csv', index=False)
-            self.logger.info(f"Posterior CSV saved: posterior_{timestamp}.csv")
+            formulas = self.next_formulas
+            points = len(formulas)
+            writer = PosteriorWriter(path, points, [], max(map(len, formulas), default=1))
+            chunks = ((self.next_coords[i:i + size], formulas[i:i + size]) for i in range(0, points, size))
+
+        record = None
+        if self.ledger is not None:
+            record = lambda labels, mean, std: self.ledger.record_posterior(self.field, self.run_id, labels, mean, std)
+        with span('posterior', points=points):
+            stream_posterior(self.bo.model, chunks, writer, shift, scale, record)
+        for name, (value, where) in (('Minimum', writer.min), ('Maximum', writer.max)):
+            self.logger.info(f"{name} uncertainty in prediction is {round(value, 1)} meV/atom at {where}")
+        self.logger.info(f"Posterior of {writer.rows} points saved: {path}")
+        return path
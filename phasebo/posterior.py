@@ -0,0 +1,109 @@
+import itertools
+import numpy as np
+from numpy import ndarray
+from typing import Callable, Iterator, Optional, Sequence, Tuple, Any
+
+def simplex_grid(dims: int, divisions: int, chunk_size: int = 65536) -> Iterator[ndarray]:
+    """
+    Regular grid over the composition simplex of a phase field with dims + 1 elements, in reduced coordinates
+    (atomic fractions of all but the first element) that are multiples of 1 / divisions, in chunks of at most
+    chunk_size points. The grid has comb(divisions + dims, dims) points.
+    """
+    # stars and bars: dims increasing positions among divisions + dims; the gaps between them
+    # run over all non-negative integer vectors with sum <= divisions
+    positions = itertools.combinations(range(divisions + dims), dims)
+    while True:
+        chunk = np.fromiter(itertools.chain.from_iterable(itertools.islice(positions, chunk_size)), dtype=np.int64)
+        if not len(chunk):
+            return
+        chunk = chunk.reshape(-1, dims)
+        yield (np.diff(chunk, axis=1, prepend=-1) - 1) / divisions
+
+def output_scale(Y: ndarray, normalization_type: str = 'stats') -> Tuple[float, float]:
+    """
+    Shift and scale that map the surrogate's normalised outputs back to energies, inverting GPyOpt's normalize:
+    energy = shift + scale * output. Standard deviations are multiplied by the scale only.
+    """
+    Y = np.asarray(Y, dtype=float)
+    if normalization_type == 'stats':
+        return Y.mean(), (Y.std() or 1.0)
+    if normalization_type == 'maxmin':
+        spread = np.ptp(Y)
+        return (Y.min() + spread / 2, spread / 2) if spread > 0 else (Y.min(), 1.0)
+    raise ValueError(f'Unknown normalization type: {normalization_type}')
+
+class PosteriorWriter:
+    """
+    Writes posterior means and standard deviations chunk by chunk to CSV or .npy and keeps the extremes
+    of the uncertainty, so that neither the points nor the predictions are held in memory at once.
+    Rows are labelled by candidate formulas or by the atomic fractions of grid points.
+    """
+
+    def __init__(self, path: str, n_rows: int, labels: Sequence[str], formula_width: int = 0):
+        self.path = path
+        self.labels = list(labels)
+        self.formula_width = formula_width
+        self.rows = 0
+        self.min: Tuple[float, Any] = (np.inf, None)
+        self.max: Tuple[float, Any] = (-np.inf, None)
+        if path.endswith('.npy'):
+            fields = [('formula', f'U{formula_width}')] if formula_width else [(label, 'f8') for label in self.labels]
+            dtype = np.dtype(fields + [('mean', 'f8'), ('std', 'f8')])
+            self.file = None
+            self.array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n_rows,))
+        else:
+            columns = ['Candidates'] if formula_width else self.labels
+            self.file = open(path, 'w')
+            self.file.write(','.join(columns + ['Posterior mean (meV/atom)', 'Uncertainty (meV/atom)']) + '\n')
+
+    def write(self, mean: ndarray, std: ndarray, formulas: Optional[Sequence[str]] = None,
+              coords: Optional[ndarray] = None) -> None:
+        rows = formulas if formulas is not None else coords
+        lowest, highest = int(np.argmin(std)), int(np.argmax(std))
+        if std[lowest] < self.min[0]:
+            self.min = (float(std[lowest]), rows[lowest])
+        if std[highest] > self.max[0]:
+            self.max = (float(std[highest]), rows[highest])
+
+        if self.file is None:
+            chunk = self.array[self.rows:self.rows + len(mean)]
+            if formulas is not None:
+                chunk['formula'] = formulas
+            else:
+                for j, label in enumerate(self.labels):
+                    chunk[label] = coords[:, j]
+            chunk['mean'], chunk['std'] = mean, std
+        else:
+            labels = formulas if formulas is not None else (','.join(f'{x:.6g}' for x in row) for row in coords)
+            lines = (f'{label},{m:.1f},{s:.1f}' for label, m, s in zip(labels, mean, std))
+            self.file.write('\n'.join(lines) + '\n')
+        self.rows += len(mean)
+
+    def close(self) -> None:
+        if self.file is None:
+            self.array.flush()
+            del self.array
+        else:
+            self.file.close()
+
+def stream_posterior(model, chunks: Iterator[Tuple[ndarray, Optional[Sequence[str]]]], writer: PosteriorWriter,
+                     shift: float = 0.0, scale: float = 1.0,
+                     record: Optional[Callable[[Sequence[str], ndarray, ndarray], None]] = None) -> PosteriorWriter:
+    """
+    Predict every chunk of points (with their formulas, if any) and write it; returns the closed writer.
+    record, if given, also receives every chunk as (labels, mean, std), with grid points labelled by their
+    comma-separated coordinates.
+    """
+    try:
+        for X, formulas in chunks:
+            if not len(X):
+                continue
+            mean, std = model.predict(X)
+            mean, std = shift + scale * mean[:, 0], scale * std[:, 0]
+            writer.write(mean, std, formulas, None if formulas is not None else X)
+            if record is not None:
+                labels = formulas if formulas is not None else [','.join(f'{x:.6g}' for x in row) for row in X]
+                record(labels, mean, std)
+    finally:
+        writer.close()
+    return writer
@@ -0,0 +1,167 @@
+import argparse
+import logging
+import time
+import yaml
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Sequence, Tuple
+
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.coordinates import coordinate_keys
+
+def replicate_seeds(n: int, base_seed: int = 0) -> List[int]:
+    """Independent, reproducible seeds for n replicates derived from one base seed."""
+    return [int(s) for s in np.random.SeedSequence(base_seed).generate_state(n)]
+
+def hull_targets(bo: PhaseFieldBO) -> Dict[bytes, str]:
+    """Coordinate keys and names of the hull phases a 'path' run can find (stable, not a reference)."""
+    targets = {}
+    references = set(bo.references)
+    for key, row in bo.index.rows.items():
+        if bo.energies[row] == 0 and bo.compositions[row] not in references:
+            targets[key] = bo.compositions[row]
+    return targets
+
+def run_replicate(task: Tuple[int, int, Any, Any, Dict[str, float], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    One 'path' replay with its own seed for seed selection and for GPyOpt.
+    Returns the visited compositions, the iteration at which each hull phase was found
+    (None if it was not), convergence curves and the wall time.
+    """
+    replicate, seed, compositions, references, ions, kwargs = task
+    logger = logging.getLogger(f'{__name__}.worker')
+    logger.propagate = False
+
+    start = time.perf_counter()
+    np.random.seed(seed)
+    bo = PhaseFieldBO(compositions, references, ions, mode='path', seed=seed, logger=logger, **kwargs)
+    wall_time = time.perf_counter() - start
+
+    n_seeds = len(bo.nseeds)
+    rows = bo.index.lookup_many(bo.bo.X)
+    # seeds at iteration 0, then as many compositions per iteration as it added
+    counts = bo.path_counts
+    iteration = np.concatenate([np.zeros(n_seeds, dtype=int), np.repeat(np.arange(1, len(counts) + 1), counts)])
+
+    targets = hull_targets(bo)
+    found = dict.fromkeys(targets.values())
+    for key, it in zip(coordinate_keys(bo.bo.X), iteration):
+        name = targets.get(key.tobytes())
+        if name is not None and found[name] is None:
+            found[name] = int(it)
+
+    energies = np.asarray(bo.bo.Y, dtype=float)[:, 0]
+    n_iter = bo.iter
+    best = np.array([energies[iteration <= it].min() for it in range(n_iter + 1)])
+    hull_found = np.array([sum(f is not None and f <= it for f in found.values()) for it in range(n_iter + 1)])
+
+    return {
+        'replicate': replicate,
+        'seed': seed,
+        'wall_time': wall_time,
+        'iterations': int(iteration.max()),
+        'seeds': [bo.compositions[r] for r in rows[:n_seeds]],
+        'path': [bo.compositions[r] for r in rows[n_seeds:]],
+        'found': found,
+        'best': best,
+        'hull_found': hull_found,
+    }
+
+def run_replicates(compositions,
+                   references,
+                   ions: Dict[str, float],
+                   n_replicates: int,
+                   base_seed: int = 0,
+                   processes: Optional[int] = None,
+                   **kwargs) -> List[Dict[str, Any]]:
+    """
+    Run n_replicates independent 'path' replays in a process pool (processes=1 runs them in this process).
+    kwargs are passed to PhaseFieldBO. Results are returned in replicate order.
+    """
+    tasks = [(i, seed, compositions, references, ions, kwargs)
+             for i, seed in enumerate(replicate_seeds(n_replicates, base_seed))]
+    if processes == 1:
+        return [run_replicate(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(run_replicate, tasks))
+
+def summarize(results: List[Dict[str, Any]], quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> Dict[str, pd.DataFrame]:
+    """
+    Aggregate replicates into three tables:
+    'replicates' (one row per replicate), 'hull_phases' (how often and how fast each hull phase
+    was found) and 'convergence' (quantiles of the best energy and of the hull phases found per iteration).
+    """
+    targets = sorted({name for r in results for name in r['found']})
+    replicates = pd.DataFrame([{
+        'replicate': r['replicate'],
+        'seed': r['seed'],
+        'wall_time': r['wall_time'],
+        'iterations': r['iterations'],
+        'hull_found': int(r['hull_found'][-1]),
+        **{name: r['found'].get(name) for name in targets},
+    } for r in results])
+
+    hull_phases = []
+    for name in targets:
+        its = np.array([r['found'][name] for r in results if r['found'].get(name) is not None], dtype=float)
+        row = {'composition': name, 'fraction_found': len(its) / len(results)}
+        for q in quantiles:
+            row[f'iterations_q{round(100 * q)}'] = np.quantile(its, q) if len(its) else np.nan
+        hull_phases.append(row)
+    hull_phases = pd.DataFrame(hull_phases, columns=['composition', 'fraction_found'] +
+                               [f'iterations_q{round(100 * q)}' for q in quantiles])
+
+    length = max(len(r['best']) for r in results)
+    pad = lambda curve: np.pad(curve, (0, length - len(curve)), mode='edge')
+    best = np.array([pad(r['best']) for r in results])
+    found = np.array([pad(r['hull_found']) for r in results])
+    convergence = {'iteration': np.arange(length)}
+    for q in quantiles:
+        convergence[f'best_q{round(100 * q)}'] = np.quantile(best, q, axis=0)
+    for q in quantiles:
+        convergence[f'hull_found_q{round(100 * q)}'] = np.quantile(found, q, axis=0)
+
+    return {'replicates': replicates, 'hull_phases': hull_phases, 'convergence': pd.DataFrame(convergence)}
+
+def main():
+    from phasebo.__main__ import read_inputs
+    from phasebo.logger import get_logger
+
+    parser = argparse.ArgumentParser(description="Run independent 'path' replicates in parallel and aggregate them.")
+    parser.add_argument("--config", type=str, default="input_config.yaml", help="Path to YAML config file")
+    parser.add_argument("-n", "--replicates", type=int, default=100, help="Number of replicates (default: 100)")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--prefix", type=str, default="replicates", help="Prefix of the output CSV files")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        cfg: Dict[str, Any] = yaml.safe_load(f)
+    compositions, references, _, exceptions = read_inputs(cfg)
+    logger = get_logger("phasebo")
+
+    start = time.perf_counter()
+    results = run_replicates(compositions, references, cfg["ions"], args.replicates,
+                             base_seed=cfg.get("seed") or 0, processes=args.processes,
+                             seeds_type=cfg["seeds_type"], n_seeds=cfg["n_seeds"], disect=cfg.get("disect", 4),
+                             exclude_zeros=True,
+                             max_iter=cfg["max_iter"], batch=cfg.get("batch_size", 4), exceptions=exceptions,
+                             cache_dir=cfg.get("cache_dir"), surrogate=cfg.get("surrogate", "GP"),
+                             num_inducing=cfg.get("num_inducing", 100), num_features=cfg.get("num_features", 500),
+                             acquisition=cfg.get("acquisition", "thompson"),
+                             chunk_size=cfg.get("chunk_size", 65536), prescreen=cfg.get("prescreen"))
+    elapsed = time.perf_counter() - start
+
+    tables = summarize(results)
+    for name, table in tables.items():
+        table.to_csv(f"{args.prefix}_{name}.csv", index=False)
+    logger.info(f"{args.replicates} replicates in {round(elapsed, 1)} s "
+                f"(median {round(tables['replicates']['wall_time'].median(), 1)} s per replicate)")
+    logger.info("Hull phases found (fraction, median iterations):")
+    for _, row in tables['hull_phases'].iterrows():
+        logger.info(f"{row['composition']} {round(row['fraction_found'], 2)} {row['iterations_q50']}")
+    logger.info(f"Results written to {args.prefix}_replicates.csv, {args.prefix}_hull_phases.csv, "
+                f"{args.prefix}_convergence.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+
+from phasebo.__main__ import read_inputs, run_arguments
+from phasebo.batch import config_files, load_config
+from phasebo.logger import get_logger
+
+class Field:
+    """
+    One phase field kept in memory: its optimiser in 'campaign' mode, the formulas handed out and still awaiting
+    results (pending), the coordinates of failed ones, and a lock serialising every request on the field.
+    """
+
+    def __init__(self, bopt, ledger=None) -> None:
+        self.bopt = bopt
+        self.ledger = ledger
+        self.lock = threading.Lock()
+        self.pending: Dict[str, np.ndarray] = {}
+        self.failed: List[np.ndarray] = []
+        # whether the surrogate was last fitted on the computed compositions alone, and whether new ones came since
+        self.fitted = False
+        self.new_results = False
+
+    def fit(self) -> None:
+        """
+        Refit the surrogate on the computed compositions from its current hyperparameters: a short refinement
+        after new results, no optimisation at all when only the fantasies of pending points are to be dropped.
+        """
+        from phasebo.surrogate import refinement
+
+        bo = self.bopt.bo
+        bo.X, bo.Y = self.bopt.candidates_fc, self.bopt.candidates_energies[:, None]
+        with refinement(bo.model):
+            if not self.new_results:
+                bo.model.max_iters = 0
+            bo._update_model(bo.normalization_type)
+        self.fitted, self.new_results = True, False
+
+    def suggest(self, n: int) -> List[str]:
+        """Up to n new formulas, away from the pending ones and never failed ones."""
+        from phasebo.surrogate import refinement
+
+        bopt = self.bopt
+        dims = bopt.next_coords.shape[1]
+        n = min(n, len(bopt.next_formulas) - len(self.pending) - len(self.failed))
+        if n <= 0:
+            return []
+        pending = np.array(list(self.pending.values())).reshape(-1, dims)
+        ignored = np.array(self.failed).reshape(-1, dims)
+        with refinement(bopt.bo.model):
+            X = bopt.suggest_pending(n, pending, ignored)
+        # the surrogate now holds the pending points as fantasies
+        self.fitted = False
+        formulas = []
+        for x in X:
+            row = bopt.next_index.lookup(x)
+            formulas.append(bopt.next_formulas[row])
+            self.pending[bopt.next_formulas[row]] = bopt.next_coords[row]
+        if self.ledger is not None:
+            self.ledger.record_suggestions(bopt.field, formulas, bopt.run_id, status='submitted')
+        bopt.logger.info(f"Suggested: {' '.join(formulas)}")
+        return formulas
+
+    def add_results(self, formulas: Sequence[str], energies: Sequence[float],
+                    failed: Sequence[str] = ()) -> Dict[str, int]:
+        """Ingest computed formulas with their total energies; failed pending formulas are not suggested again."""
+        bopt = self.bopt
+        n_old = len(bopt.compositions)
+        if len(formulas):
+            bopt.add_results(list(formulas), [float(e) for e in energies], suggest=False)
+        added = len(bopt.compositions) - n_old
+        self.new_results = self.new_results or added > 0
+        for formula in failed:
+            if formula in self.pending:
+                self.failed.append(self.pending.pop(formula))
+        if len(failed) and self.ledger is not None:
+            self.ledger.set_status(bopt.field, list(failed), 'failed')
+        # computed compositions left the domain, and with them their pending formulas
+        self.pending = {f: x for f, x in self.pending.items() if bopt.next_index.lookup(x) >= 0}
+        self.fitted = self.fitted and not added
+        bopt.logger.info(f"Results: {added} compositions added, {len(failed)} failed")
+        return {'added': added, 'pending': len(self.pending), 'candidates': len(bopt.next_formulas)}
+
+    def posterior(self, formulas: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Posterior mean and uncertainty (meV/atom) at the formulas, by default at all candidates."""
+        if not self.fitted:
+            self.fit()
+        formulas = list(formulas) if formulas else list(self.bopt.next_formulas)
+        mean, std = self.bopt.posterior(formulas)
+        return {'formulas': formulas, 'mean': mean.tolist(), 'std': std.tolist()}
+
+    def status(self) -> Dict[str, Any]:
+        """Elements, numbers of entries, candidates and failures, and the pending formulas; call under the lock."""
+        bopt = self.bopt
+        return {'elements': bopt.elements, 'entries': len(bopt.compositions), 'candidates': len(bopt.next_formulas),
+                'pending': list(self.pending), 'failed': len(self.failed)}
+
+def load_field(cfg: Dict[str, Any], logger: logging.Logger, tables: Optional[Dict[str, Any]] = None) -> Field:
+    """Read the inputs of a config, set up its phase field in 'campaign' mode and fit the surrogate once."""
+    from phasebo.ledger import Ledger
+    from phasebo.phase_field_bo import PhaseFieldBO
+
+    compositions, references, next_formulas, exceptions = read_inputs(cfg, tables)
+    args = run_arguments(cfg)
+    ledger = Ledger(args['ledger']) if args['ledger'] else None
+    run_id = ledger.start_run('-'.join(args['ions']), 'server', cfg) if ledger is not None else None
+    if args['seed'] is not None:
+        np.random.seed(args['seed'])
+    bopt = PhaseFieldBO(compositions, references, args['ions'], mode='campaign', Ntot=args['Ntot'],
+                        limits=args['limits'], next_formulas=next_formulas, batch=args['batch_size'],
+                        exceptions=exceptions, logger=logger, cache_dir=args['cache_dir'],
+                        surrogate=args['surrogate'], num_inducing=args['num_inducing'],
+                        num_features=args['num_features'], acquisition=args['acquisition'],
+                        chunk_size=args['chunk_size'], prescreen=args['prescreen'], seed=args['seed'],
+                        ledger=ledger, run_id=run_id, hull_processes=args['hull_processes'])
+    bopt.bo._update_model(bopt.bo.normalization_type)
+    field = Field(bopt, ledger)
+    field.fitted = True
+    logger.info(f"Phase field {bopt.field}: {len(bopt.compositions)} entries, {len(bopt.next_formulas)} candidates")
+    return field
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    JSON over HTTP:
+        GET  /fields                       phase fields and their state
+        POST /fields/<field>/suggest       {"n": 4} -> {"formulas": [...]}
+        POST /fields/<field>/results       {"formulas": [...], "energies": [...], "failed": [...]}
+        POST /fields/<field>/posterior     {"formulas": [...]} (default: all candidates) -> {"mean": [...], "std": [...]}
+    Fields are named by their elements, e.g. Li-Sn-S-Cl. Requests on one field are served one at a time.
+    """
+    server_version = 'phasebo'
+
+    def reply(self, code: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        parts = self.path.strip('/').split('/')
+        fields = self.server.fields
+        if parts == ['fields']:
+            self.reply(200, {name: self.status(field) for name, field in fields.items()})
+        elif len(parts) == 2 and parts[0] == 'fields' and parts[1] in fields:
+            self.reply(200, self.status(fields[parts[1]]))
+        else:
+            self.reply(404, {'error': f'Not found: {self.path}'})
+
+    @staticmethod
+    def status(field: Field) -> Dict[str, Any]:
+        # a suggestion or results request may be changing the field meanwhile
+        with field.lock:
+            return field.status()
+
+    def do_POST(self) -> None:
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'fields' or parts[1] not in self.server.fields:
+            self.reply(404, {'error': f'Not found: {self.path}'})
+            return
+        field = self.server.fields[parts[1]]
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            with field.lock:
+                if parts[2] == 'suggest':
+                    result = {'formulas': field.suggest(int(body.get('n', field.bopt.batch)))}
+                elif parts[2] == 'results':
+                    formulas, energies = body.get('formulas', []), body.get('energies', [])
+                    if len(formulas) != len(energies):
+                        raise ValueError('formulas and energies differ in length')
+                    result = field.add_results(formulas, energies, body.get('failed', []))
+                elif parts[2] == 'posterior':
+                    result = field.posterior(body.get('formulas'))
+                else:
+                    self.reply(404, {'error': f'Not found: {self.path}'})
+                    return
+        except (ValueError, TypeError, KeyError) as err:
+            self.reply(400, {'error': f'{type(err).__name__}: {err}'})
+            return
+        except Exception as err:
+            self.server.logger.exception(f"Request {self.path} failed")
+            self.reply(500, {'error': f'{type(err).__name__}: {err}'})
+            return
+        self.reply(200, result)
+
+    def address_string(self) -> str:
+        # clients of a Unix socket have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format: str, *args) -> None:
+        self.server.logger.info(f"{self.address_string()} {format % args}")
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(fields: Dict[str, Field], logger: logging.Logger, host: str = '127.0.0.1', port: int = 8765,
+                socket_path: Optional[str] = None):
+    """HTTP server on host:port, or on the Unix socket socket_path, handling each request in its own thread."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), Handler)
+    server.fields = fields
+    server.logger = logger
+    return server
+
+def load_fields(configs: Sequence[str], logger: logging.Logger) -> Dict[str, Field]:
+    """One field per config, named by its elements; input tables shared between configs are read once."""
+    tables: Dict[str, Any] = {}
+    fields: Dict[str, Field] = {}
+    for path in configs:
+        field = load_field(load_config(path), logger, tables)
+        if field.bopt.field in fields:
+            raise ValueError(f"Phase field {field.bopt.field} is configured twice ({path})")
+        fields[field.bopt.field] = field
+    return fields
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve suggestions and posteriors for phase fields kept in memory.")
+    parser.add_argument("configs", nargs="+", help="YAML config files and/or directories of them")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead of a port")
+    args = parser.parse_args()
+
+    logger = get_logger("phasebo")
+    fields = load_fields(config_files(args.configs), logger)
+    server = make_server(fields, logger, args.host, args.port, args.socket)
+    logger.info(f"Serving {', '.join(fields)} on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for field in fields.values():
+            if field.ledger is not None:
+                field.ledger.finish_run(field.bopt.run_id)
+                field.ledger.close()
+
+if __name__ == "__main__":
+    main()
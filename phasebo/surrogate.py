@@ -0,0 +1,180 @@
+import numpy as np
+from numpy import ndarray
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from scipy.linalg import cho_factor, cho_solve
+from GPyOpt.models import GPModel
+from GPyOpt.models.base import BOModel
+
+SURROGATES = ('GP', 'sparseGP', 'random_features')
+
+# Optimiser iterations (single start) refining warm-started GP hyperparameters
+REFINE_ITERS = 100
+
+class RandomFeatureModel(BOModel):
+    """
+    Random Fourier feature approximation of a GP with an RBF kernel: Bayesian linear regression
+    on num_features features cos(W x + b). Fitting costs O(n num_features^2), prediction O(num_features^2)
+    per point, so the surrogate scales linearly with the number of observations.
+
+    Hyperparameters (lengthscale, signal variance, noise variance) maximise the marginal likelihood
+    over a grid; with max_iters == 0 the current ones are kept and only the weights are refitted.
+    """
+
+    MCMC_sampler = False
+    analytical_gradient_prediction = True
+
+    LENGTHSCALES = np.geomspace(0.02, 2.0, 12)
+    VARIANCES = np.array([0.25, 0.5, 1.0, 2.0, 4.0])
+    NOISES = np.geomspace(1e-6, 1e-1, 11)
+
+    def __init__(self, num_features: int = 500, seed: int = 0, max_iters: int = 1) -> None:
+        self.num_features = num_features
+        self.seed = seed
+        self.max_iters = max_iters
+        self.params: Optional[ndarray] = None
+        self.X: Optional[ndarray] = None
+
+    def _base(self, dim: int) -> None:
+        rng = np.random.default_rng(self.seed)
+        self.W0 = rng.standard_normal((self.num_features, dim))
+        self.b = rng.uniform(0, 2 * np.pi, self.num_features)
+
+    def _features(self, X: ndarray, lengthscale: float, variance: float) -> ndarray:
+        return np.sqrt(2 * variance / self.num_features) * np.cos(X @ (self.W0 / lengthscale).T + self.b)
+
+    def _optimize(self, X: ndarray, Y: ndarray) -> ndarray:
+        """Grid search of the log marginal likelihood, using one eigendecomposition per lengthscale."""
+        n, y = len(X), Y[:, 0]
+        best, best_params = -np.inf, None
+        for lengthscale in self.LENGTHSCALES:
+            phi = self._features(X, lengthscale, 1.0)
+            lam, U = np.linalg.eigh(phi.T @ phi)
+            lam = np.clip(lam, 0, None)
+            z2 = (U.T @ (phi.T @ y)) ** 2
+            for variance in self.VARIANCES:
+                for noise in self.NOISES:
+                    a = variance * lam / noise + 1
+                    fit = y @ y / noise - np.sum(variance * z2 / noise ** 2 / a)
+                    loglik = -0.5 * (fit + np.sum(np.log(a)) + n * np.log(noise))
+                    if loglik > best:
+                        best, best_params = loglik, np.array([lengthscale, variance, noise])
+        return best_params
+
+    def updateModel(self, X_all: ndarray, Y_all: ndarray, X_new, Y_new) -> None:
+        if self.X is None or self.X.shape[1] != X_all.shape[1]:
+            self._base(X_all.shape[1])
+        self.X = X_all
+        if self.params is None or self.max_iters > 0:
+            self.params = self._optimize(X_all, Y_all)
+        self.set_parameters(self.params, X_all, Y_all)
+
+    def set_parameters(self, params: ndarray, X: ndarray, Y: ndarray) -> None:
+        """Fix the hyperparameters and fit the posterior over the feature weights."""
+        if self.X is None or self.X.shape[1] != X.shape[1]:
+            self._base(X.shape[1])
+        self.X, self.params = X, np.asarray(params, dtype=float)
+        lengthscale, variance, noise = self.params
+        phi = self._features(X, lengthscale, variance)
+        factor = cho_factor(phi.T @ phi / noise + np.eye(self.num_features))
+        self.weights = cho_solve(factor, phi.T @ Y[:, 0] / noise)
+        self.covariance = cho_solve(factor, np.eye(self.num_features))
+
+    def predict(self, X: ndarray, with_noise: bool = True):
+        """Posterior means and standard deviations at X."""
+        X = np.atleast_2d(X)
+        lengthscale, variance, noise = self.params
+        phi = self._features(X, lengthscale, variance)
+        m = phi @ self.weights
+        v = np.sum(phi * (phi @ self.covariance), axis=1) + (noise if with_noise else 0)
+        return m[:, None], np.sqrt(np.clip(v, 1e-10, np.inf))[:, None]
+
+    def get_fmin(self) -> float:
+        return self.predict(self.X)[0].min()
+
+    def predict_withGradients(self, X: ndarray):
+        """Mean, standard deviation and their gradients at X."""
+        X = np.atleast_2d(X)
+        lengthscale, variance, noise = self.params
+        W = self.W0 / lengthscale
+        scale = np.sqrt(2 * variance / self.num_features)
+        arg = X @ W.T + self.b
+        phi = scale * np.cos(arg)
+        dphi = -scale * np.sin(arg)
+        m = phi @ self.weights
+        cov = phi @ self.covariance
+        v = np.clip(np.sum(phi * cov, axis=1) + noise, 1e-10, np.inf)
+        s = np.sqrt(v)
+        dmdx = (dphi * self.weights) @ W
+        dsdx = ((dphi * cov) @ W) / s[:, None]
+        return m[:, None], s[:, None], dmdx, dsdx
+
+    def get_model_parameters(self) -> ndarray:
+        return np.atleast_2d(self.params)
+
+    def get_model_parameters_names(self):
+        return ['lengthscale', 'variance', 'noise']
+
+def model_arguments(surrogate: str = 'GP', num_inducing: int = 100, num_features: int = 500) -> Dict[str, Any]:
+    """Keyword arguments of GPyOpt's BayesianOptimization that select the surrogate model."""
+    if surrogate == 'GP':
+        return {'model_type': 'GP'}
+    if surrogate == 'sparseGP':
+        # a single restart: each one already costs O(n num_inducing^2) per optimiser step
+        return {'model_type': 'sparseGP', 'num_inducing': num_inducing, 'optimize_restarts': 1}
+    if surrogate == 'random_features':
+        return {'model': RandomFeatureModel(num_features)}
+    raise ValueError(f'Unsupported surrogate: "{surrogate}". Supported: {", ".join(SURROGATES)}')
+
+def get_parameters(model: BOModel) -> ndarray:
+    """Current hyperparameters of the surrogate; empty before the first fit."""
+    if isinstance(model, GPModel):
+        return model.model.param_array.copy() if model.model is not None else np.array([])
+    return model.get_model_parameters().ravel() if model.params is not None else np.array([])
+
+def set_parameters(model: BOModel, X: ndarray, Y: ndarray, params: ndarray) -> bool:
+    """Build the surrogate on X, Y (normalised) with the given hyperparameters; returns success."""
+    if isinstance(model, GPModel):
+        model._create_model(X, Y)
+        if model.model.param_array.shape == params.shape:
+            model.model[:] = params
+            return True
+        model.model = None
+        return False
+    if len(params) != 3:
+        return False
+    model.set_parameters(params, X, Y)
+    return True
+
+def output_stats(Y: ndarray) -> ndarray:
+    """Mean, standard deviation and number of the observed outputs, which set the normalisation of the fit."""
+    Y = np.asarray(Y, dtype=float)
+    return np.array([Y.mean(), Y.std(), len(Y)])
+
+def output_drift(old: ndarray, new: ndarray) -> float:
+    """
+    How far the observations moved since hyperparameters were fitted on them: the largest of the shift of
+    the mean and the log ratio of the spreads (relative to the old spread) and the relative change in their number.
+    """
+    mean, std, n = old
+    std = std or 1.0
+    return float(max(abs(new[0] - mean) / std, abs(np.log((new[1] or 1.0) / std)), abs(new[2] - n) / max(n, 1)))
+
+@contextmanager
+def refinement(model: BOModel) -> Iterator[None]:
+    """
+    Within the context, fits of the surrogate start from its current hyperparameters and only refine them:
+    a single short optimisation for GPs, none for the random feature grid search (only the weights are refitted).
+    """
+    saved = {k: getattr(model, k) for k in ('max_iters', 'optimize_restarts') if hasattr(model, k)}
+    if isinstance(model, GPModel):
+        model.optimize_restarts = 1
+        model.max_iters = min(model.max_iters, REFINE_ITERS)
+    else:
+        model.max_iters = 0
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            setattr(model, k, v)
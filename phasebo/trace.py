@@ -0,0 +1,153 @@
+import functools
+import json
+import logging
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 where it cannot be measured)."""
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+class Span:
+    """
+    One timed stage: wall and CPU time, peak RSS at its end, how much it raised the peak,
+    and item counts (entries, candidates, batch size, ...) given at entry or added with count().
+    """
+
+    def __init__(self, tracer: 'Tracer', name: str, counts: Dict[str, int]):
+        self.tracer = tracer
+        self.name = name
+        self.counts = dict(counts)
+        self.depth = 0
+        self.parent: Optional[str] = None
+
+    def count(self, **counts) -> None:
+        self.counts.update(counts)
+
+    def __enter__(self) -> 'Span':
+        stack = self.tracer.stack
+        self.depth = len(stack)
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.time()
+        self.rss_start = peak_rss_mb()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self.peak_rss = peak_rss_mb()
+        self.tracer.stack.pop()
+        self.tracer.record(self, failed=exc_type is not None)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'start': self.start,
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'peak_rss_mb': self.peak_rss,
+            'rss_growth_mb': self.peak_rss - self.rss_start,
+            'counts': self.counts,
+        }
+
+class _NullSpan:
+    """Returned while tracing is off: entering, leaving and counting do nothing."""
+
+    def count(self, **counts) -> None:
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """Collects spans, logs every finished one and exports them as a JSON trace."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.logger = logging.getLogger(__name__)
+        self.spans: List[Dict[str, Any]] = []
+        self.stack: List[Span] = []
+
+    def span(self, name: str, **counts):
+        return Span(self, name, counts) if self.enabled else _NULL_SPAN
+
+    def record(self, span: Span, failed: bool = False) -> None:
+        entry = span.to_dict()
+        if failed:
+            entry['failed'] = True
+        self.spans.append(entry)
+        counts = ''.join(f' {k}={v}' for k, v in span.counts.items())
+        self.logger.info(f"[trace] {'  ' * span.depth}{span.name}: wall {entry['wall_s']:.3f} s, "
+                         f"cpu {entry['cpu_s']:.3f} s, peak RSS {entry['peak_rss_mb']:.1f} MB "
+                         f"(+{entry['rss_growth_mb']:.1f}){counts}{' FAILED' if failed else ''}")
+
+    def export(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({'spans': self.spans}, f, indent=1, default=float)
+
+TRACER = Tracer()
+
+def enable(logger: Optional[logging.Logger] = None) -> None:
+    """Start recording spans, logged with logger (default: this module's)."""
+    TRACER.enabled = True
+    if logger is not None:
+        TRACER.logger = logger
+
+def disable() -> None:
+    TRACER.enabled = False
+
+def reset() -> None:
+    TRACER.spans = []
+    TRACER.stack = []
+
+def enabled() -> bool:
+    return TRACER.enabled
+
+def span(name: str, **counts):
+    """
+    Context manager timing a stage, e.g.
+
+        with span('compute_convex', entries=len(entries)) as s:
+            ...
+            s.count(stable=n_stable)
+
+    A no-op while tracing is off.
+    """
+    return TRACER.span(name, **counts)
+
+def traced(name: str, function: Callable, counts: Optional[Callable[[], Dict[str, int]]] = None) -> Callable:
+    """Wrap function so that every call is a span; counts() gives the item counts at call time."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with span(name, **(counts() if counts else {})):
+            return function(*args, **kwargs)
+    return wrapper
+
+def recorded() -> List[Dict[str, Any]]:
+    """The spans recorded since the last reset, as written by export."""
+    return TRACER.spans
+
+def export(path: str) -> None:
+    """Write the recorded spans to a JSON file."""
+    TRACER.export(path)
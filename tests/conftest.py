@@ -0,0 +1,29 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'LiSnSCl_700eV.csv'))
+
+@pytest.fixture(scope='module')
+def data_file():
+    """The example Li-Sn-S-Cl table: compositions and total energies, references from row 195."""
+    return DATA
+
+@pytest.fixture(scope='module')
+def ions():
+    return {'Li': 1, 'Sn': 4, 'S': -2, 'Cl': -1}
+
+@pytest.fixture(scope='module')
+def field_data(ions):
+    """Compositions, references and ions of the example phase field."""
+    df = pd.read_csv(DATA, header=0)
+    return df.values[:, :2], df.values[195:], ions
+
+@pytest.fixture(scope='module')
+def candidate_data(field_data):
+    """The example field with rows 150-194 held out as candidate formulas: known, references, ions, candidates."""
+    compositions, references, ions = field_data
+    candidates = [str(c).strip() for c in compositions[150:195, 0]]
+    known = np.vstack([compositions[:150], compositions[195:]])
+    return known, references, ions, candidates
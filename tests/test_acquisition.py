@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import logging
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.acquisition import thompson_batch, row_hashes
+
+class LinearModel:
+    """Posterior mean is the first coordinate, with a constant standard deviation."""
+
+    def __init__(self, std=0.0):
+        self.std = std
+
+    def predict(self, X):
+        return X[:, :1], np.full((len(X), 1), self.std)
+
+@pytest.fixture
+def domain():
+    return np.random.default_rng(0).dirichlet(np.ones(4), size=5000)[:, 1:]
+
+def test_row_hashes_identify_rows(domain):
+    assert len(np.unique(row_hashes(domain))) == len(domain)
+    assert np.array_equal(row_hashes(domain[:10].copy()), row_hashes(domain)[:10])
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, 10000])
+@pytest.mark.parametrize("prescreen", [None, 3.0])
+def test_thompson_batch_picks_lowest_distinct_rows(domain, chunk_size, prescreen):
+    order = np.argsort(domain[:, 0])
+    excluded = domain[order[:2]]
+    rows = thompson_batch(LinearModel(), domain, 5, excluded, chunk_size, prescreen)
+    assert list(rows) == list(order[2:7])
+
+def test_thompson_batch_samples_are_distinct_and_not_excluded(domain):
+    np.random.seed(0)
+    excluded = domain[::3]
+    rows = thompson_batch(LinearModel(std=0.5), domain, 8, excluded, chunk_size=333, prescreen=4.0)
+    assert len(set(rows)) == 8
+    assert not np.isin(row_hashes(domain[rows]), row_hashes(excluded)).any()
+
+def test_suggest_with_chunked_thompson(candidate_data):
+    known, references, ions, candidates = candidate_data
+    np.random.seed(0)
+    bo = PhaseFieldBO(known, references, ions, mode='suggest',
+                      next_formulas=candidates, batch=4, acquisition='chunked_thompson', chunk_size=10,
+                      prescreen=4.0, logger=logging.getLogger('test_logger'))
+    suggested = [bo.next_index.lookup(n) for n in bo.next]
+    assert len(set(suggested)) == 4 and min(suggested) >= 0
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from phasebo.batch import config_files, field_references, with_references, run_batch
+
+@pytest.fixture
+def write_config(data_file, ions):
+    base = {'inputfile': data_file, 'reference_index': 195, 'mode': 'suggest', 'log': 'run', 'ions': ions,
+            'N_atom': 8, 'seeds_type': 'random', 'n_seeds': 5, 'max_iter': 1, 'batch_size': 2, 'seed': 0}
+
+    def write(path, **cfg):
+        path.write_text(yaml.safe_dump(dict(base, **cfg)))
+    return write
+
+def test_shared_references():
+    references = np.array([['Li1', -1.9], ['S1', -4.1], ['O1', -4.9], ['Li2 O1', -14.3]], dtype=object)
+    own = field_references(references, {'Li': 1, 'S': -2})
+    assert list(own[:, 0]) == ['Li1', 'S1']
+
+    compositions = np.array([['Li2 S1', -12.0], ['Li1 ', -1.5], ['S1', -4.0]], dtype=object)
+    table = with_references(compositions, own)
+    assert list(table[:, 0]) == ['Li2 S1', 'Li1', 'S1']
+    assert list(table[:, 1]) == [-12.0, -1.9, -4.1]
+
+def test_batch_summary(tmp_path, write_config):
+    configs = tmp_path / 'configs'
+    configs.mkdir()
+    write_config(configs / 'lisnscl.yaml')
+    write_config(configs / 'generate.yaml', mode='generate')
+    # references outside the phase field
+    write_config(configs / 'broken.yaml', ions={'Na': 1, 'Cl': -1})
+    # candidates of an earlier run, which 'generate' mode appends to
+    (tmp_path / 'out' / 'generate').mkdir(parents=True)
+    (tmp_path / 'out' / 'generate' / 'candidates_list.csv').write_text('Li2 S1\n')
+    assert [os.path.basename(c) for c in config_files([str(configs)])] == ['broken.yaml', 'generate.yaml',
+                                                                           'lisnscl.yaml']
+
+    summary = run_batch(config_files([str(configs)]), str(tmp_path / 'out'), processes=2)
+    rows = {row['field']: row for _, row in summary.iterrows()}
+    assert list(summary['field']) == ['broken', 'generate', 'lisnscl']
+
+    assert rows['lisnscl']['status'] == 'done'
+    assert len(rows['lisnscl']['suggestions'].split()) == 2
+    assert (tmp_path / 'out' / 'lisnscl').is_dir()
+    assert rows['generate']['candidates'] == len(pd.read_csv(tmp_path / 'out' / 'generate' / 'candidates_list.csv',
+                                                             header=None)) - 1
+    assert rows['broken']['status'] == 'failed' and rows['broken']['error']
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import logging
+from concurrent.futures import Future
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.campaign import Evaluator, TableEnergy, load_evaluator
+
+class RecordingEvaluator(Evaluator):
+    """Evaluates synchronously from the table and records the submitted formulas; the first n_failing fail."""
+
+    def __init__(self, table, n_failing=0):
+        self.table = table
+        self.n_failing = n_failing
+        self.futures = []
+
+    def submit(self, formula):
+        future = Future()
+        if len(self.futures) < self.n_failing:
+            future.set_exception(RuntimeError('SCF did not converge'))
+        else:
+            future.set_result(self.table(formula))
+        self.futures.append((formula, future))
+        return future
+
+@pytest.fixture(scope='module')
+def campaign_data(field_data):
+    compositions, references, ions = field_data
+    order = np.random.default_rng(1).permutation(195)
+    known = np.vstack([compositions[195:], compositions[order[:120]]])
+    held_out = [str(c).strip() for c in compositions[order[120:], 0]]
+    return known, references, ions, held_out
+
+def test_table_energy_scales_to_formula(data_file):
+    table = TableEnergy(data_file)
+    assert table('Li1') == pytest.approx(-1.903)
+    assert table('Li3') == pytest.approx(3 * -1.903)
+    # lowest energy of all tabulated Li2S polymorphs and cell sizes
+    assert table('Li2 Sn0 S1 Cl0') == pytest.approx(-47.981 / 4)
+    assert table('Li4 S2') == pytest.approx(2 * table('Li2 S1'))
+    with pytest.raises(KeyError):
+        table('Li7 Sn3 S1 Cl12')
+
+def test_campaign_ingests_results_as_they_return(campaign_data, data_file, caplog):
+    known, references, ions, held_out = campaign_data
+    np.random.seed(0)
+    bo = PhaseFieldBO(known, references, ions, mode='campaign', next_formulas=held_out,
+                      batch=3, max_iter=8, logger=logging.getLogger('test_logger'))
+    n_known = len(bo.compositions)
+    evaluator = RecordingEvaluator(TableEnergy(data_file), n_failing=1)
+
+    with caplog.at_level(logging.WARNING, logger='test_logger'):
+        results = bo.run_campaign(evaluator, n_parallel=3, max_evaluations=8)
+
+    submitted = [f for f, _ in evaluator.futures]
+    failing = submitted[:1]
+    assert len(submitted) == 8
+    assert len(set(submitted)) == 8
+    computed = [f for f in submitted if f not in failing]
+    assert sorted(f for f, _ in results) == sorted(computed)
+    assert len(bo.compositions) == n_known + len(computed)
+    # computed formulas leave the domain, failed ones are never suggested again
+    assert np.all(bo.index.lookup_many(bo.next_coords) < 0)
+    assert failing[0] in bo.next_formulas
+    assert bo.campaign_failed == failing
+    assert f'Evaluation of {failing[0]} failed' in caplog.text
+    # batches of the size in demand come from a copy of the optimiser's evaluator
+    assert bo.bo.evaluator.batch_size == 3
+
+def test_evaluator_needs_submit():
+    with pytest.raises(TypeError):
+        Evaluator()
+
+def test_campaign_in_process_pool(campaign_data, data_file):
+    known, references, ions, held_out = campaign_data
+    np.random.seed(0)
+    bo = PhaseFieldBO(known, references, ions, mode='campaign', next_formulas=held_out,
+                      batch=2, max_iter=4, logger=logging.getLogger('test_logger'))
+    with load_evaluator(data_file, max_workers=2) as evaluator:
+        results = bo.run_campaign(evaluator)
+    assert len(results) == 4
+    table = TableEnergy(data_file)
+    for formula, energy in results:
+        assert energy == pytest.approx(table(formula))
@@ -0,0 +1,95 @@
+import random
+import numpy as np
+import logging
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.checkpoint import get_rng_state, set_rng_state
+
+def path_run(field_data, max_iter, seed, **kwargs):
+    compositions, references, ions = field_data
+    np.random.seed(seed)
+    random.seed(seed)
+    return PhaseFieldBO(compositions, references, ions, mode='path', n_seeds=10, max_iter=max_iter, batch=2,
+                        logger=logging.getLogger('test_logger'), **kwargs)
+
+def test_rng_state_roundtrip():
+    arrays, meta = get_rng_state()
+    expected = np.random.rand(3), random.random()
+    np.random.seed(1)
+    random.seed(1)
+    set_rng_state(arrays, meta)
+    assert np.array_equal(np.random.rand(3), expected[0])
+    assert random.random() == expected[1]
+
+def test_resumed_path_matches_uninterrupted_run(field_data, tmp_path):
+    full = path_run(field_data, 4, 3)
+    # writing checkpoints does not change the trajectory
+    chunked = path_run(field_data, 4, 3, checkpoint=str(tmp_path / 'full.npz'), checkpoint_every=2)
+    assert np.array_equal(chunked.bo.X, full.bo.X)
+
+    # a run killed after two iterations, resumed with a different global seed
+    path_run(field_data, 2, 3, checkpoint=str(tmp_path / 'killed.npz'), checkpoint_every=2)
+    resumed = path_run(field_data, 4, 99, checkpoint=str(tmp_path / 'killed.npz'), checkpoint_every=2, resume=True)
+
+    assert resumed.seeds == full.seeds
+    assert np.array_equal(resumed.bo.X, full.bo.X)
+    assert np.array_equal(resumed.bo.Y, full.bo.Y)
+    assert resumed.path_counts == full.path_counts == [2] * 4
+
+def test_path_checkpoint_of_other_field_is_ignored(field_data, tmp_path):
+    compositions, references, ions = field_data
+    checkpoint = str(tmp_path / 'path.npz')
+    path_run(field_data, 1, 0, checkpoint=checkpoint)
+    other = PhaseFieldBO(compositions[1:], references, ions, mode='path', n_seeds=10, max_iter=1, batch=2,
+                         checkpoint=checkpoint, resume=True, logger=logging.getLogger('test_logger'))
+    assert len(other.bo.X) == 10 + 2
+
+def test_resumed_suggest_reuses_domain_and_hyperparameters(field_data, tmp_path):
+    compositions, references, ions = field_data
+    checkpoint = str(tmp_path / 'suggest.npz')
+    candidates = [str(c).strip() for c in compositions[150:195, 0]]
+    known = np.vstack([compositions[:150], compositions[195:]])
+    np.random.seed(0)
+    first = PhaseFieldBO(known, references, ions, mode='suggest', next_formulas=candidates, batch=2,
+                         checkpoint=checkpoint, logger=logging.getLogger('test_logger'))
+    params = first.bo.model.model.param_array.copy()
+
+    resumed = PhaseFieldBO(known, references, ions, mode='suggest', batch=2,
+                           checkpoint=checkpoint, resume=True, logger=logging.getLogger('test_logger'))
+    assert resumed.next_formulas == [f for f, x in zip(first.next_formulas, first.next_coords) if x not in first.index]
+    assert np.array_equal(resumed.bo.model.model.param_array, params)
+
+    # new results since the checkpoint leave the domain
+    more = np.vstack([known, compositions[150:155]])
+    updated = PhaseFieldBO(more, references, ions, mode='suggest', batch=2,
+                           checkpoint=checkpoint, resume=True, logger=logging.getLogger('test_logger'))
+    assert np.all(updated.index.lookup_many(updated.next_coords) < 0)
+    assert len(updated.next_formulas) < len(first.next_formulas)
+
+def test_warm_started_hyperparameters(field_data, tmp_path, monkeypatch):
+    compositions, references, ions = field_data
+    monkeypatch.chdir(tmp_path)
+    starts = []
+    warm_start = PhaseFieldBO.warm_start
+
+    def recorded(self):
+        starts.append(warm_start(self))
+        return starts[-1]
+    monkeypatch.setattr(PhaseFieldBO, 'warm_start', recorded)
+
+    def suggest(table, **kwargs):
+        np.random.seed(0)
+        return PhaseFieldBO(table, references, ions, mode='suggest', Ntot=8, batch=2, cache_dir='cache',
+                            logger=logging.getLogger('test_logger'), **kwargs)
+
+    cold = suggest(compositions)
+    changed = compositions.copy()
+    changed[:3, 1] = changed[:3, 1] - 0.01
+    warm = suggest(changed)
+    assert starts == [False, True]
+    assert np.allclose(warm.bo.model.model.param_array, cold.bo.model.model.param_array, rtol=0.05)
+
+    # energies shifted far beyond the stored spread: full optimisation
+    shifted = compositions.copy()
+    shifted[:195, 1] = shifted[:195, 1] - 5.0
+    suggest(shifted, refit_drift=0.2)
+    assert starts == [False, True, False]
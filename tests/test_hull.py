@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+import logging
+from phasebo.phase_field import PhaseField
+from phasebo.hull import facet_planes, hull_energies, subsystem_hull
+from phasebo.coordinates import simplex_coordinates
+from phasebo.list_compositions import amount_blocks
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+
+@pytest.mark.parametrize("allow_negative", [False, True])
+def test_compute_convex_matches_per_entry(field_data, allow_negative):
+    compositions, references, ions = field_data
+    pf = PhaseField(compositions, references, ions, allow_negative=allow_negative, logger=logging.getLogger('test_logger'))
+
+    # pymatgen's phase diagram of all entries, independent of the stable flags compute_convex set
+    reference = PhaseDiagram(pf.computed_entries)
+    expected = []
+    for entry in pf.computed_entries:
+        hull_energy = 1000 * reference.get_e_above_hull(entry)
+        if allow_negative and hull_energy == 0:
+            try:
+                hull_energy = 1000 * reference.get_equilibrium_reaction_energy(entry)
+            except ValueError:
+                pass
+        expected.append(hull_energy)
+
+    assert np.allclose(pf.energies, expected, rtol=0, atol=1e-6)
+    assert np.count_nonzero(pf.energies == 0) == np.count_nonzero(np.array(expected) == 0)
+
+@pytest.mark.parametrize("allow_negative", [False, True])
+def test_add_results_matches_rebuild(field_data, allow_negative):
+    compositions, references, ions = field_data
+    logger = logging.getLogger('test_logger')
+    order = np.random.default_rng(0).permutation(195)
+    base = np.vstack([compositions[195:], compositions[order[:150]]])
+    extra = compositions[order[150:]]
+    # one entry far below the hull forces a hull update
+    extra = np.vstack([extra, np.array([['Li2 Sn1 S2 Cl2', -60.0]], dtype=object)])
+
+    full = PhaseField(np.vstack([base, extra]), references, ions, allow_negative=allow_negative, logger=logger)
+    pf = PhaseField(base, references, ions, allow_negative=allow_negative, logger=logger)
+    for k in range(0, len(extra), 7):
+        pf.add_results(list(extra[k:k + 7, 0]), list(extra[k:k + 7, 1]))
+
+    assert np.array_equal(pf.compositions, full.compositions)
+    assert np.allclose(pf.energies, full.energies, rtol=0, atol=1e-6)
+    assert np.array_equal(pf.stable, full.stable)
+    assert {c: v[0] for c, v in pf.dic.items()} == pytest.approx({c: v[0] for c, v in full.dic.items()})
+    assert list(pf.candidates) == list(full.candidates)
+    for fc, e in zip(full.pd_coords, full.energies):
+        assert pf.f(fc) == pytest.approx(full.f(fc))
+
+def test_cache_restores_phase_field(field_data, tmp_path):
+    compositions, references, ions = field_data
+    logger = logging.getLogger('test_logger')
+    built = PhaseField(compositions, references, ions, allow_negative=True, logger=logger, cache_dir=str(tmp_path))
+    cached = PhaseField(compositions, references, ions, allow_negative=True, logger=logger, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert cached._pd is None and cached._computed_entries is None
+    assert np.array_equal(cached.compositions, built.compositions)
+    assert np.array_equal(cached.energies, built.energies)
+    assert np.array_equal(cached.pd_coords, built.pd_coords)
+    assert list(cached.candidates) == list(built.candidates)
+
+    # the hull rebuilt from cached stable entries behaves like the original one
+    extra = (['Li2 Sn1 S2 Cl2', 'Li3 Sn1 S2 Cl3'], [-60.0, -20.0])
+    built.add_results(*extra)
+    cached.add_results(*extra)
+    assert np.allclose(cached.energies, built.energies, rtol=0, atol=1e-6)
+
+    # any change to the inputs invalidates the cache
+    PhaseField(compositions, references, ions, allow_negative=False, logger=logger, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 2
+
+def random_field(ions, n_entries, Ntot, seed):
+    """Charge-balanced compositions with random formation energies from -0.3 eV/atom, and elemental references."""
+    rng = np.random.default_rng(seed)
+    symbols = list(ions)
+    pool = np.vstack(list(amount_blocks(ions, Ntot)))
+    amounts = pool[(pool > 0).sum(axis=1) >= 2][rng.choice(len(pool), n_entries)]
+    mu = rng.uniform(-5, -1, len(ions))
+    energies = amounts @ mu + amounts.sum(axis=1) * rng.normal(-0.3, 0.2, n_entries)
+    rows = [[' '.join(f'{s}{n}' for s, n in zip(symbols, a) if n), e] for a, e in zip(amounts, energies)]
+    compositions = np.array(rows + [[f'{s}1', m] for s, m in zip(symbols, mu)], dtype=object)
+    return compositions, compositions[-len(ions):], ions
+
+def test_subsystem_hull_matches_phase_diagram():
+    ions = {'Li': 1, 'S': -2, 'Cl': -1, 'Sn': 4, 'Mg': 2}
+    compositions, references, ions = random_field(ions, 3000, Ntot=14, seed=3)
+    pf = PhaseField(compositions, references, ions, allow_negative=False, logger=logging.getLogger('test_logger'))
+    lowest = pf.lowest_entries(pf.amounts, pf.enthalpies)
+    entries, _ = pf.computed_compositions(pf.compositions[lowest], pf.enthalpies[lowest])
+    pd = PhaseDiagram(entries)
+    assert [el.symbol for el in pd.elements] == pf.pd_elements
+    pf.pd = pd
+    assert np.array_equal(pf.stable, pf.is_stable(np.arange(len(pf.compositions))))
+
+    # pruning the full field in chunks, in a process pool, gives the same hull
+    coords = simplex_coordinates(pf.amounts)
+    vertices, planes = subsystem_hull(pf.amounts[lowest], pf.energies_per_atom[lowest], processes=2, chunk_size=100)
+    assert np.array_equal(vertices, np.flatnonzero(pf.stable[lowest]))
+    expected = hull_energies(coords, facet_planes(pd.qhull_data, pd.facets))
+    assert np.allclose(hull_energies(coords, planes), expected, rtol=0, atol=1e-9)
+    assert np.allclose(hull_energies(coords, pf.hull_planes), expected, rtol=0, atol=1e-9)
+    for processes in (0, -1):
+        assert np.array_equal(subsystem_hull(pf.amounts[lowest], pf.energies_per_atom[lowest], processes)[0], vertices)
+
+    with pytest.raises(ValueError, match='Missing terminal entries'):
+        subsystem_hull(pf.amounts[lowest][:-1], pf.energies_per_atom[lowest][:-1], elements=pf.pd_elements)
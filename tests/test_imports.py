@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import subprocess
+import yaml
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+HEAVY = ('GPyOpt', 'GPy', 'sklearn', 'matplotlib', 'pymatgen')
+
+RUN_MAIN = """
+import json, runpy, sys
+sys.argv = ['phasebo', '--config', 'config.yaml']
+runpy.run_module('phasebo', run_name='__main__')
+print(json.dumps({'modules': sorted(sys.modules)}))
+"""
+
+def python_env():
+    return dict(os.environ, PYTHONPATH=os.path.abspath(ROOT) + os.pathsep + os.environ.get('PYTHONPATH', ''))
+
+def test_import_skips_the_bo_stack():
+    # -X importtime lists every module imported, whatever the machine's speed
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import phasebo.__main__'], env=python_env(),
+                         capture_output=True, text=True, check=True)
+    imported = {line.split('|')[-1].strip().split('.')[0] for line in out.stderr.splitlines()
+                if line.startswith('import time:')}
+    assert 'phasebo' in imported
+    assert not imported & set(HEAVY)
+
+def test_generate_mode_skips_the_bo_stack(tmp_path, data_file, ions):
+    config = {'inputfile': data_file, 'reference_index': 195, 'mode': 'generate', 'log': 'generate',
+              'ions': ions, 'N_atom': 12, 'seeds_type': 'random', 'n_seeds': 5, 'max_iter': 1}
+    (tmp_path / 'config.yaml').write_text(yaml.safe_dump(config))
+
+    out = subprocess.run([sys.executable, '-c', RUN_MAIN], cwd=tmp_path, env=python_env(),
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    loaded = {m.split('.')[0] for m in result['modules']}
+    assert not loaded & set(HEAVY)
+    assert (tmp_path / 'candidates_list.csv').read_text().splitlines()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from phasebo.__main__ import read_inputs
+from phasebo.coordinates import amount_matrix, parse_formula
+from phasebo.ingest import read_table, save_table
+from phasebo.phase_field import PhaseField
+
+def test_amount_matrix():
+    formulas = ['Li2 Sn0 S1 Cl0', 'Cl3Li1Sn1S1', 'Li(SCl)2', 'Li0.5 S', 'Li2 S1', 'Li2 O0 S1']
+    elements = ['Li', 'Sn', 'S', 'Cl']
+    expected = [[parse_formula(f).get(el, 0) for el in elements] for f in formulas]
+    assert np.array_equal(amount_matrix(formulas, elements), expected)
+
+def test_read_table_in_chunks(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text('composition,energy\nLi2 S1,-12.0\n Li2 O1 ,-14.3\nS1 ,-4.1\nLi1 Sn0 O0,-1.9\nNa1 Cl1,-6.8\n')
+    table, rows = read_table(str(path), ['Li', 'S'], chunk_size=2)
+    assert list(table[:, 0]) == ['Li2 S1', 'S1', 'Li1 Sn0 O0']
+    assert list(table[:, 1]) == [-12.0, -4.1, -1.9]
+    assert list(rows) == [0, 2, 3]
+
+    save_table(str(tmp_path / 'table.npz'), table)
+    again, _ = read_table(str(tmp_path / 'table.npz'), chunk_size=2)
+    assert np.array_equal(again, table)
+
+def test_inputs_and_hull_unchanged(tmp_path, data_file, ions):
+    df = pd.read_csv(data_file, header=0)
+    cfg = {'inputfile': data_file, 'reference_index': 195, 'ions': ions}
+    compositions, references, _, _ = read_inputs(cfg)
+    assert list(compositions[:, 0]) == [c.strip() for c in df.values[:, 0]]
+    assert np.array_equal(compositions[:, 1], df.values[:, 1])
+    assert np.array_equal(references, compositions[195:])
+
+    # duplicates of every composition with higher energies do not change the hull
+    field = PhaseField(df.values[:, :2], references, ions)
+    worse = df.values[:, :2].copy()
+    worse[:, 1] = worse[:, 1] + 1.0
+    duplicated = PhaseField(np.vstack([df.values[:, :2], worse]), references, ions)
+    n = len(df)
+    assert np.array_equal(duplicated.energies[:n], field.energies)
+    assert np.array_equal(duplicated.stable[:n], field.stable)
+    assert not duplicated.stable[n:].any()
@@ -0,0 +1,46 @@
+import numpy as np
+import logging
+from phasebo.__main__ import run
+from phasebo.ledger import Ledger, composition_keys
+
+def test_composition_keys():
+    assert composition_keys(['Li2 S1', 'Li4S2', 'S1 Li2 Cl0']) == ['Li0.666667 S0.333333'] * 3
+    assert composition_keys([]) == []
+
+def test_pending_until_computed(tmp_path):
+    with Ledger(str(tmp_path / 'ledger.sqlite')) as ledger:
+        run_id = ledger.start_run('Li-S', 'suggest')
+        assert ledger.record_suggestions('Li-S', ['Li2 S1', 'Li1 S1', 'Li2 S2'], run_id) == 1
+        assert ledger.record_suggestions('Li-S', ['Li4 S1'], run_id, status='submitted') == 2
+        assert ledger.pending('Li-S') == ['Li2 S1', 'Li1 S1', 'Li2 S2', 'Li4 S1']
+
+        # any cell of a suggested composition computes it; observations are recorded once
+        ledger.record_observations('Li-S', ['Li4 S2', 'Li4 S2', 'Li2 S2'], [-24.0, -24.0, -9.0])
+        ledger.set_status('Li-S', ['Li4 S1'], 'failed')
+        assert ledger.pending('Li-S') == []
+        assert ledger.pending('Li-Cl') == []
+        assert ledger.db.execute("SELECT COUNT(*) FROM observations").fetchone()[0] == 2
+        energies = dict(ledger.db.execute("SELECT formula, energy FROM suggestions WHERE status = 'computed'"))
+        assert energies == {'Li2 S1': -24.0, 'Li1 S1': -9.0, 'Li2 S2': -9.0}
+
+        ledger.record_posterior('Li-S', run_id, ['Li2 S1'], np.array([1.0]), np.array([2.0]))
+        later = ledger.start_run('Li-S', 'suggest')
+        ledger.record_posterior('Li-S', later, ['Li1 S1', 'Li4 S1'], np.array([3.0, 4.0]), np.array([5.0, 6.0]))
+        assert ledger.latest_posterior('Li-S') == [('Li1 S1', 3.0, 5.0), ('Li4 S1', 4.0, 6.0)]
+
+def test_suggest_run_recorded(candidate_data, tmp_path, monkeypatch):
+    known, references, ions, candidates = candidate_data
+    monkeypatch.chdir(tmp_path)
+    np.random.seed(0)
+    bo = run(known, references, ions, 'suggest', 24, 'random', 9, 1, 'test', logging.getLogger('test_logger'),
+             batch_size=2, next_formulas=candidates, plot_mode='none', ledger='ledger.sqlite')
+
+    suggested = [bo.next_formulas[bo.next_index.lookup(x)] for x in bo.next]
+    with Ledger('ledger.sqlite') as ledger:
+        assert ledger.pending('Li-Sn-S-Cl') == suggested
+        assert len(ledger.latest_posterior('Li-Sn-S-Cl')) == len(bo.next_formulas)
+        observed = set(zip(bo.compositions, bo.enthalpies))
+        assert ledger.db.execute("SELECT COUNT(*) FROM observations").fetchone()[0] == len(observed)
+        stages = {name for name, in ledger.db.execute("SELECT name FROM stages")}
+        assert {'run', 'setBO', 'posterior'} <= stages
+        assert ledger.db.execute("SELECT finished FROM runs").fetchone()[0] is not None
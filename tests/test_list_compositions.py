@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from math import gcd
+from phasebo.coordinates import amount_matrix, distinct_compositions
+from phasebo.list_compositions import span, balance, generate, enumerate_amounts, amount_blocks, candidate_formulas
+
+@pytest.mark.parametrize("ions, Ntot, limits", [
+    ({'Li': 1, 'Zn': 2, 'S': -2, 'Cl': -1}, 12, None),
+    ({'Li': 1, 'Sn': 4, 'S': -2, 'Cl': -1}, 16, {'Li': [0, 10], 'Sn': [0, 5], 'S': [0, 10], 'Cl': [0, 5]}),
+    ({'Li': 1, 'X': 0, 'O': -2}, 8, None),
+])
+def test_enumerate_amounts_matches_cartesian_product(ions, Ntot, limits):
+    expected = [tuple(int(n) for n in a) for a in balance(span(ions, Ntot, limits), list(ions.values()))]
+    assert list(enumerate_amounts(ions, Ntot, limits)) == expected
+
+def test_generate_skips_inlist_and_exclude():
+    ions = {'Li': 1, 'Zn': 2, 'S': -2, 'Cl': -1}
+    names = generate(ions, [], None, 6, None)
+    assert 'Li2Zn0S1Cl0' in names
+    filtered = generate(ions, ['Li2Zn0S1Cl0'], ['Li1Zn0S0Cl1'], 6, None)
+    assert 'Li2Zn0S1Cl0' not in filtered
+    assert 'Li1Zn0S0Cl1' not in filtered
+    assert len(filtered) == len(names) - 2
+
+def test_amount_blocks_are_bounded_and_balanced():
+    ions = {'Li': 1, 'Zn': 2, 'S': -2, 'Cl': -1}
+    blocks = list(amount_blocks(ions, 12, chunk_size=10))
+    assert all(len(b) <= 10 for b in blocks)
+    amounts = np.vstack(blocks)
+    assert np.all(amounts @ np.array(list(ions.values())) == 0)
+    assert np.all(amounts.sum(axis=1) <= 12)
+
+def test_distinct_compositions_keep_smallest_cells():
+    ions = {'Li': 1, 'Zn': 2, 'S': -2, 'Cl': -1}
+    names = generate(ions, [], None, 8, None)
+    rows = distinct_compositions(amount_matrix(names, list(ions)), amount_matrix(['Li2 S1'], list(ions)))
+    kept = [names[i] for i in rows]
+    assert list(rows) == sorted(rows)
+    assert 'Li1Zn0S0Cl1' in kept and 'Li2Zn0S0Cl2' not in kept
+    # computed compositions leave in every cell size
+    assert 'Li2Zn0S1Cl0' not in kept and 'Li4Zn0S2Cl0' not in kept
+    # one formula per reduced composition, Li2 S1 excepted
+    reduced = {tuple(n // gcd(*a) for n in a) for a in enumerate_amounts(ions, 8)}
+    assert len(kept) == len(reduced) - 1
+
+def test_candidate_formulas_leave_out_known_compositions():
+    ions = {'Li': 1, 'Zn': 2, 'S': -2, 'Cl': -1}
+    names = candidate_formulas(ions, ['Li2 S1', 'Na1 Cl1'], ['Li1 Cl1'], 8, None)
+    assert len(names) == len(set(names))
+    assert not {'Li2Zn0S1Cl0', 'Li4Zn0S2Cl0', 'Li1Zn0S0Cl1', 'Li2Zn0S0Cl2'} & set(names)
+    reduced = {tuple(n // gcd(*a) for n in a) for a in enumerate_amounts(ions, 8)}
+    assert len(names) == len(reduced) - 2
@@ -66,3 +66,79 @@ def test_get_seeds_from_segments(dummy_data):
     fc, energies = pf.get_seeds_from_segments(disect=2)
     assert len(fc) == len(pf.seeds)
     assert len(energies) == len(pf.seeds)
+
+def test_get_coordinates_matches_phase_diagram(dummy_data):
+    logger = logging.getLogger('test_logger')
+    compositions, references, ions, exceptions = dummy_data
+    pf = PhaseField(compositions, references, ions, exceptions, logger=logger)
+    expected = PhaseField.get_phase_coordinates(pf.pd, pf.formulas)
+    assert np.array_equal(pf.pd_coords, expected)
+
+    formulas = ['Li2B0O1S0', 'Li1B1O0S2', 'B2O3']
+    entries, comps = PhaseField.computed_compositions(formulas, np.zeros(len(formulas)))
+    assert np.allclose(pf.get_coordinates(formulas), PhaseField.get_phase_coordinates(pf.pd, comps))
+
+def test_f_looks_up_energies_by_coordinates(dummy_data):
+    logger = logging.getLogger('test_logger')
+    compositions, references, ions, exceptions = dummy_data
+    pf = PhaseField(compositions, references, ions, exceptions, logger=logger)
+    for fc, e, c in zip(pf.pd_coords, pf.energies, pf.compositions):
+        # keys must survive last-bit rounding differences
+        x = np.nextafter(fc, 1)[None, :]
+        assert pf.f(x) == e
+        assert pf.lookup(x) == (e, c)
+    assert pf.f(np.full(len(ions) - 1, 0.3)) == 0.0
+
+def test_convex_grid_matches_pointwise_interpolation(field_data):
+    from scipy import interpolate
+    compositions, references, ions = field_data
+    pf = PhaseField(compositions, references, ions, logger=logging.getLogger('test_logger'))
+    x, y, z = pf.convex_grid(0.05)
+    f_interp = interpolate.LinearNDInterpolator(pf.get_2D_square_coordinates(), pf.energies)
+    expected = np.array([[f_interp(xi, yi) for xi in x] for yi in y]).reshape(z.shape)
+    assert z.shape == (len(y), len(x)) == (20, 20)
+    assert np.allclose(z, expected, equal_nan=True)
+
+def test_convex_grid_is_cached(field_data, tmp_path, monkeypatch):
+    from scipy import interpolate
+    compositions, references, ions = field_data
+    logger = logging.getLogger('test_logger')
+    grid = PhaseField(compositions, references, ions, logger=logger, cache_dir=str(tmp_path)).convex_grid(0.05)
+    assert list(tmp_path.glob('grid-*.npz'))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('grid recomputed')
+    monkeypatch.setattr(interpolate, 'LinearNDInterpolator', fail)
+    cached = PhaseField(compositions, references, ions, logger=logger, cache_dir=str(tmp_path)).convex_grid(0.05)
+    assert all(np.array_equal(a, b, equal_nan=True) for a, b in zip(grid, cached))
+
+def test_save_ternary_convex(tmp_path):
+    compositions = np.array([['Li2 S1', -12.0], ['Li1 Cl1', -7.5], ['S1 Cl2', -9.0], ['Li3 S1 Cl1', -19.5],
+                             ['Li1', -1.9], ['S1', -4.1], ['Cl1', -1.8]], dtype=object)
+    pf = PhaseField(compositions, compositions[-3:], {'Li': 1, 'S': -2, 'Cl': -1},
+                    logger=logging.getLogger('test_logger'))
+    points, height = pf.projection_2d()
+    assert np.isclose(height, np.sqrt(3) / 2)
+    assert np.all(points[:, 1] <= height + 1e-12)
+
+    for name in ('convex.png', 'convex.svg', 'convex.npz'):
+        pf.save_convex(str(tmp_path / name))
+        assert (tmp_path / name).stat().st_size > 0
+    with np.load(tmp_path / 'convex.npz') as grid:
+        assert grid['energies'].shape == (len(grid['y']), len(grid['x']))
+        assert np.array_equal(grid['points'], points)
+
+def test_segments_cover_all_coordinates(field_data):
+    compositions, references, ions = field_data
+    pf = PhaseField(compositions, references, ions, logger=logging.getLogger('test_logger'), seed=0)
+    cells = pf.segment_pf(disect=3)
+    assert sorted(np.concatenate(pf.sections)) == list(range(len(pf.candidates)))
+    for section in pf.sections:
+        assert len(set(cells[section])) == 1
+    # all four atomic fractions are split, not only the first two coordinates
+    assert len(pf.sections) > 9
+
+    names = list(pf.candidates)
+    fc, _ = pf.get_seeds_from_segments(disect=3, n=5)
+    assert len(fc) == 5
+    assert len({cells[names.index(s)] for s in pf.seeds}) == 5
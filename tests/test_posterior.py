@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import logging
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.posterior import simplex_grid
+
+def test_simplex_grid_chunks():
+    grid = list(simplex_grid(3, 6, chunk_size=10))
+    assert max(len(chunk) for chunk in grid) == 10
+    points = np.vstack(grid)
+    # C(9, 3) points with 6 intervals on each of 3 coordinates
+    assert len(points) == 84 == len({tuple(p) for p in np.rint(points * 6).astype(int)})
+    assert np.all(points >= 0) and np.all(points.sum(axis=1) <= 1 + 1e-12)
+
+def test_streamed_posterior_in_energy_units(candidate_data, tmp_path, monkeypatch):
+    known, references, ions, candidates = candidate_data
+    monkeypatch.chdir(tmp_path)
+    np.random.seed(0)
+    bo = PhaseFieldBO(known, references, ions, mode='suggest', next_formulas=candidates, batch=2,
+                      chunk_size=7, logger=logging.getLogger('test_logger'))
+    mean, std = bo.bo.model.predict(bo.next_coords)
+    Y = bo.bo.Y
+
+    posterior = pd.read_csv(bo.get_uncertainty(path='posterior.csv'))
+    assert list(posterior['Candidates']) == bo.next_formulas
+    assert np.allclose(posterior['Posterior mean (meV/atom)'], (Y.mean() + Y.std() * mean[:, 0]), atol=0.051)
+    assert np.allclose(posterior['Uncertainty (meV/atom)'], Y.std() * std[:, 0], atol=0.051)
+
+    grid = np.load(bo.get_uncertainty(mesh=8, path='grid.npy'))
+    assert grid.dtype.names == ('Sn', 'S', 'Cl', 'mean', 'std')
+    assert len(grid) == 165
+    assert np.all(grid['std'] > 0)
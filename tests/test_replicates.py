@@ -0,0 +1,28 @@
+import numpy as np
+from phasebo.replicates import run_replicates, summarize, replicate_seeds
+
+def test_replicate_seeds_are_reproducible():
+    assert replicate_seeds(5, 1) == replicate_seeds(5, 1)
+    assert len(set(replicate_seeds(100, 1))) == 100
+    assert replicate_seeds(3, 1) != replicate_seeds(3, 2)
+
+def test_replicates_are_deterministic_and_aggregated(field_data):
+    compositions, references, ions = field_data
+    kwargs = dict(n_seeds=10, max_iter=2, batch=2, exclude_zeros=True)
+    serial = run_replicates(compositions, references, ions, 3, base_seed=7, processes=1, **kwargs)
+    pooled = run_replicates(compositions, references, ions, 3, base_seed=7, processes=2, **kwargs)
+
+    assert [r['path'] for r in serial] == [r['path'] for r in pooled]
+    assert [r['seeds'] for r in serial] == [r['seeds'] for r in pooled]
+    assert serial[0]['seeds'] != serial[1]['seeds']
+    for r in serial:
+        assert len(r['path']) == 2 * 2 and r['iterations'] == 2
+        assert np.all(np.diff(r['best']) <= 0)
+        assert np.all(np.diff(r['hull_found']) >= 0)
+        assert r['hull_found'][-1] == sum(f is not None for f in r['found'].values())
+
+    tables = summarize(serial)
+    assert list(tables['replicates']['replicate']) == [0, 1, 2]
+    assert len(tables['convergence']) == 3
+    assert set(tables['hull_phases']['composition']) == set(serial[0]['found'])
+    assert tables['hull_phases']['fraction_found'].between(0, 1).all()
@@ -0,0 +1,96 @@
+import json
+import threading
+import logging
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from phasebo.server import load_field, make_server
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory, candidate_data, data_file):
+    tmp = tmp_path_factory.mktemp('server')
+    _, _, ions, candidates = candidate_data
+    df = pd.read_csv(data_file, header=0)
+    pd.concat([df.iloc[:150], df.iloc[195:]]).to_csv(tmp / 'known.csv', index=False)
+    pd.DataFrame({'composition': candidates}).to_csv(tmp / 'candidates.csv', index=False)
+    cfg = {'inputfile': str(tmp / 'known.csv'), 'reference_index': 150, 'compositionfile': str(tmp / 'candidates.csv'),
+           'ions': ions, 'mode': 'campaign', 'N_atom': 24, 'seeds_type': 'random',
+           'n_seeds': 9, 'max_iter': 10, 'batch_size': 2, 'log': 'test', 'seed': 0,
+           'ledger': str(tmp / 'ledger.sqlite')}
+    field = load_field(cfg, logging.getLogger('test_logger'))
+    httpd = make_server({field.bopt.field: field}, logging.getLogger('test_logger'), port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}', field, df
+    httpd.shutdown()
+    httpd.server_close()
+    field.ledger.close()
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST')
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def test_concurrent_suggestions_do_not_overlap(server):
+    url, field, df = server
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(post(f'{url}/fields/Li-Sn-S-Cl/suggest', {'n': 2})))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    suggested = [f for answer in answers for f in answer['formulas']]
+    assert len(suggested) == 6 and len(set(suggested)) == 6
+    assert sorted(field.pending) == sorted(suggested)
+    assert field.ledger.pending('Li-Sn-S-Cl') == list(field.pending)
+
+    # results of one suggestion and a failure of another release both
+    energies = dict(zip((str(c).strip() for c in df.values[:, 0]), df.values[:, 1]))
+    result = post(f'{url}/fields/Li-Sn-S-Cl/results',
+                  {'formulas': suggested[:1], 'energies': [energies[suggested[0]]], 'failed': suggested[1:2]})
+    assert result['added'] == 1 and result['pending'] == 4
+    assert suggested[0] not in field.bopt.next_formulas
+    assert sorted(field.ledger.pending('Li-Sn-S-Cl')) == sorted(suggested[2:])
+
+def test_posterior_matches_surrogate(server):
+    url, field, _ = server
+    formulas = field.bopt.next_formulas[:5]
+    result = post(f'{url}/fields/Li-Sn-S-Cl/posterior', {'formulas': formulas})
+    # fitted on the computed compositions only, without the fantasies of pending suggestions
+    assert len(field.bopt.bo.model.model.X) == len(field.bopt.candidates_fc)
+    mean, std = field.bopt.posterior(formulas)
+    assert np.allclose(result['mean'], mean) and np.allclose(result['std'], std)
+    assert len(post(f'{url}/fields/Li-Sn-S-Cl/posterior', {})['mean']) == len(field.bopt.next_formulas)
+
+    with pytest.raises(urllib.error.HTTPError) as err:
+        post(f'{url}/fields/Li-Sn-S-Cl/posterior', {'formulas': ['Na1 Cl1']})
+    assert err.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as err:
+        post(f'{url}/fields/Li-S/suggest', {})
+    assert err.value.code == 404
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+def test_status_during_suggestions(server):
+    url, field, _ = server
+    before = list(field.pending)
+    statuses = []
+    threads = [threading.Thread(target=lambda: post(f'{url}/fields/Li-Sn-S-Cl/suggest', {'n': 2})) for _ in range(2)]
+    threads += [threading.Thread(target=lambda: statuses.append(get(f'{url}/fields'))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # each status is taken between whole suggestions: the pending formulas then, in the order handed out
+    pending = list(field.pending)
+    assert len(pending) == len(before) + 4
+    for status in statuses:
+        state = status['Li-Sn-S-Cl']
+        assert len(state['pending']) in (len(before), len(before) + 2, len(before) + 4)
+        assert state['pending'] == pending[:len(state['pending'])]
+        assert state['candidates'] == len(field.bopt.next_formulas)
+    assert get(f'{url}/fields/Li-Sn-S-Cl')['pending'] == pending
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import logging
+from phasebo.phase_field_bo import PhaseFieldBO
+from phasebo.surrogate import RandomFeatureModel, model_arguments
+
+def test_random_features_fit_and_gradients():
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 3))
+    Y = (np.sin(4 * X[:, 0]) + X[:, 1] ** 2)[:, None]
+    Y = (Y - Y.mean()) / Y.std()
+    model = RandomFeatureModel(200)
+    model.updateModel(X, Y, None, None)
+
+    m, s = model.predict(X)
+    assert np.sqrt(np.mean((m - Y) ** 2)) < 0.05
+    assert np.all(s > 0)
+
+    x = rng.random((1, 3))
+    m, s, dmdx, dsdx = model.predict_withGradients(x)
+    eps = 1e-6
+    for j in range(3):
+        step = x.copy()
+        step[0, j] += eps
+        m2, s2 = model.predict(step)
+        assert (m2[0, 0] - m[0, 0]) / eps == pytest.approx(dmdx[0, j], rel=1e-3, abs=1e-6)
+        assert (s2[0, 0] - s[0, 0]) / eps == pytest.approx(dsdx[0, j], rel=1e-3, abs=1e-6)
+
+def test_unsupported_surrogate():
+    with pytest.raises(ValueError):
+        model_arguments('neural_net')
+
+@pytest.mark.parametrize("surrogate", ['sparseGP', 'random_features'])
+def test_suggest_with_approximate_surrogate(candidate_data, surrogate, tmp_path, monkeypatch):
+    known, references, ions, candidates = candidate_data
+    monkeypatch.chdir(tmp_path)
+    np.random.seed(0)
+    bo = PhaseFieldBO(known, references, ions, mode='suggest', next_formulas=candidates, batch=4,
+                      surrogate=surrogate, num_inducing=20, num_features=200, logger=logging.getLogger('test_logger'))
+    suggested = [bo.next_index.lookup(n) for n in bo.next]
+    assert len(set(suggested)) == 4 and min(suggested) >= 0
+    bo.get_uncertainty()
+    assert len(list(tmp_path.glob('posterior_*.csv'))) == 1
@@ -0,0 +1,54 @@
+import json
+import logging
+import numpy as np
+import pytest
+from phasebo import trace
+from phasebo.phase_field_bo import PhaseFieldBO
+
+@pytest.fixture
+def tracing():
+    trace.reset()
+    trace.enable(logging.getLogger('test_logger'))
+    yield trace.TRACER
+    trace.disable()
+    trace.reset()
+
+def test_disabled_spans_are_not_recorded():
+    trace.reset()
+    with trace.span('stage', entries=3) as s:
+        s.count(candidates=5)
+    assert trace.TRACER.spans == []
+
+def test_nested_spans_and_export(tracing, tmp_path):
+    with trace.span('outer', entries=10) as outer:
+        with trace.span('inner'):
+            sum(range(10000))
+        outer.count(candidates=4)
+    with pytest.raises(ValueError):
+        with trace.span('broken'):
+            raise ValueError
+
+    inner, outer, broken = tracing.spans
+    assert (inner['name'], inner['parent'], inner['depth']) == ('inner', 'outer', 1)
+    assert outer['counts'] == {'entries': 10, 'candidates': 4}
+    assert outer['wall_s'] >= inner['wall_s'] >= 0
+    assert broken['failed']
+    assert tracing.stack == []
+
+    path = tmp_path / 'trace.json'
+    trace.export(str(path))
+    assert [s['name'] for s in json.loads(path.read_text())['spans']] == ['inner', 'outer', 'broken']
+
+def test_suggest_run_stages(tracing, field_data):
+    compositions, references, ions = field_data
+    np.random.seed(0)
+    PhaseFieldBO(compositions, references, ions, mode='suggest',
+                 Ntot=8, batch=2, logger=logging.getLogger('test_logger'))
+    spans = {s['name']: s for s in tracing.spans}
+    assert {'phase_field', 'compute_convex', 'generate', 'get_dom_phase', 'setBO',
+            'fit_model', 'acquisition'} <= set(spans)
+    assert spans['compute_convex']['parent'] == 'phase_field'
+    # known compositions and multiples of one reduced composition leave before the domain is built
+    dom = spans['get_dom_phase']['counts']
+    assert dom['domain'] == dom['candidates'] < spans['generate']['counts']['candidates']
+    assert spans['acquisition']['counts']['batch'] == 2